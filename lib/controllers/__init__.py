@@ -0,0 +1 @@
+from lib.controllers.authors import add_author_with_articles
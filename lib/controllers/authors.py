@@ -0,0 +1,21 @@
+from lib.db.connection import transaction
+from lib.models.article import Article
+from lib.models.author import Author
+
+
+def add_author_with_articles(author_name, articles_data, batch_size=1000):
+    """
+    Add an author and their articles in a single transaction
+    articles_data: iterable of dicts with 'title' and 'magazine_id' keys
+    """
+    try:
+        with transaction():
+            author = Author.create(author_name)
+            Article.bulk_create(
+                ((article['title'], author.id, article['magazine_id']) for article in articles_data),
+                batch_size
+            )
+        return True
+    except Exception as e:
+        print(f"Transaction failed: {e}")
+        return False
@@ -0,0 +1,11 @@
+from lib.db.connection import (
+    PROFILES, ConnectionPool, PoolTimeout, after_commit, after_rollback, apply_profile, configure,
+    connection, get_connection, get_pool, iter_rows, on_connect, on_rollback,
+    scope, transaction,
+)
+from lib.db.identity import identity_map
+from lib.db.session import Session, current_session
+from lib.db.loader import batch
+from lib.db.aio import configure_executor
+from lib.db.writer import configure_writer
+from lib.db.retry import configure_retry
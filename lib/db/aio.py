@@ -0,0 +1,183 @@
+"""Asyncio counterparts of the model methods.
+
+sqlite3 calls block, so afind_by_id(), aarticles(), asave() and the rest run
+the synchronous method on a dedicated thread pool. Each worker thread pins
+its own connection from a pool sized to match, so the executor never starves
+synchronous callers of the shared pool. A per-event-loop semaphore bounds
+how many calls can be queued or running at once. Cancelling the awaiting
+task drops a call that has not started yet and interrupts the SQLite
+statement of one that has.
+
+The caller's context (identity map, Session) is copied into the worker the
+same way asyncio.to_thread() does it. The caller's scope() or transaction()
+connection is not shared, because it belongs to another thread.
+"""
+import asyncio
+import contextvars
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.db.connection import ConnectionPool, _owner, _scoped_connection, get_pool, on_reconfigure
+
+
+class _Call:
+    def __init__(self, executor, fn, args, kwargs):
+        self.executor = executor
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.context = contextvars.copy_context()
+        self.conn = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self.context.run(self._run)
+
+    def _run(self):
+        conn = self.executor._connection()
+        with self._lock:
+            self.conn = conn
+        token = _scoped_connection.set(conn)
+        try:
+            return self.fn(*self.args, **self.kwargs)
+        finally:
+            _scoped_connection.reset(token)
+            with self._lock:
+                self.conn = None
+
+    def interrupt(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+
+class Executor:
+    """Thread pool that runs model calls for coroutines, one connection per worker."""
+
+    def __init__(self, max_workers=4, max_pending=64):
+        shared = get_pool()
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pool = ConnectionPool(
+            shared.database, max_size=max_workers, idle_timeout=float('inf'),
+            timeout=shared.timeout, profile=shared.profile,
+        )
+        self._threads = ThreadPoolExecutor(max_workers, thread_name_prefix='lib.db.aio')
+        self._local = threading.local()
+        self._semaphores = {}
+        self._pinned = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.pool.acquire()
+            conn.scoped = True
+            conn.owner = _owner()
+            with self._lock:
+                self._pinned.append(conn)
+        return conn
+
+    def _enter(self, loop):
+        with self._lock:
+            entry = self._semaphores.get(loop)
+            if entry is None:
+                entry = self._semaphores[loop] = [asyncio.Semaphore(self.max_pending), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _exit(self, loop):
+        # The semaphore holds its loop, so keep the entry only while the loop
+        # has calls in flight; otherwise every finished loop stays alive.
+        with self._lock:
+            entry = self._semaphores[loop]
+            entry[1] -= 1
+            if not entry[1]:
+                del self._semaphores[loop]
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        semaphore = self._enter(loop)
+        try:
+            async with semaphore:
+                call = _Call(self, fn, args, kwargs)
+                future = asyncio.wrap_future(self._threads.submit(call))
+                try:
+                    return await future
+                except asyncio.CancelledError:
+                    call.interrupt()
+                    raise
+        finally:
+            self._exit(loop)
+
+    def shutdown(self):
+        """Wait for running calls, then close every worker connection."""
+        self._threads.shutdown(wait=True)
+        with self._lock:
+            pinned, self._pinned = self._pinned, []
+        for conn in pinned:
+            conn.scoped = False
+            conn.close()
+        self.pool.close_all()
+
+
+_executor = None
+_executor_options = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = Executor(**_executor_options)
+        return _executor
+
+
+def configure_executor(**options):
+    """Replace the async executor, e.g. configure_executor(max_workers=8, max_pending=256)."""
+    global _executor, _executor_options
+    with _executor_lock:
+        old, _executor = _executor, None
+        _executor_options = options
+    if old is not None:
+        old.shutdown()
+
+
+@on_reconfigure
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        old, _executor = _executor, None
+    if old is not None:
+        old.shutdown()
+
+
+async def run(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on the shared async executor."""
+    return await get_executor().run(fn, *args, **kwargs)
+
+
+def _async_method(name, bound_to_class):
+    if bound_to_class:
+        async def method(cls, *args, **kwargs):
+            return await run(getattr(cls, name), *args, **kwargs)
+        method = classmethod(method)
+    else:
+        async def method(self, *args, **kwargs):
+            return await run(getattr(self, name), *args, **kwargs)
+    target = method.__func__ if bound_to_class else method
+    target.__name__ = target.__qualname__ = 'a' + name
+    target.__doc__ = f"Awaitable {name}(), run on the lib.db.aio executor."
+    return method
+
+
+def async_methods(*names):
+    """Class decorator adding an a<name> coroutine for each named method."""
+    def decorate(cls):
+        for name in names:
+            bound_to_class = isinstance(inspect.getattr_static(cls, name), classmethod)
+            setattr(cls, 'a' + name, _async_method(name, bound_to_class))
+        return cls
+    return decorate
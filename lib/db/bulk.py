@@ -0,0 +1,68 @@
+from itertools import islice
+
+from lib.db.connection import connection
+from lib.db.retry import begin_immediate
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(sql, rows, batch_size=1000):
+    """Insert rows with executemany in batches, all inside one transaction.
+
+    rows may be any iterable, including a generator. Returns the new row ids in
+    insertion order; they are read back as a rowid range per batch, which is
+    exact because the transaction holds SQLite's write lock throughout.
+    """
+    ids = []
+    with connection() as conn:
+        if not conn.in_transaction:
+            begin_immediate(conn)
+        for batch in batched(rows, batch_size):
+            conn.executemany(sql, batch)
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            ids.extend(range(last_id - len(batch) + 1, last_id + 1))
+    return ids
+
+
+def bulk_upsert(sql, table, rows, batch_size=1000):
+    """Run an INSERT ... ON CONFLICT (name) statement over rows in batches, all
+    inside one transaction, and return {name: id} for every row.
+
+    Each row's first value must be the name.
+    """
+    ids = {}
+    with connection() as conn:
+        if not conn.in_transaction:
+            begin_immediate(conn)
+        for batch in batched(rows, batch_size):
+            conn.executemany(sql, batch)
+            names = list({row[0] for row in batch})
+            placeholders = ", ".join("?" * len(names))
+            for row in conn.execute(f"SELECT id, name FROM {table} WHERE name IN ({placeholders})", names):
+                ids[row['name']] = row['id']
+    return ids
+
+
+def fetch_grouped(sql, owners, key, batch_size=500):
+    """Run a query for many owners at once and group the rows per owner.
+
+    owners are model instances or ids. sql must contain an
+    "IN ({placeholders})" list of owner ids, and every row must carry its
+    owner id in column key. Returns {owner id: [rows]}, with an empty list
+    for owners that have no rows.
+    """
+    ids = list(dict.fromkeys(getattr(owner, 'id', owner) for owner in owners))
+    grouped = {id: [] for id in ids}
+    with connection() as conn:
+        for batch in batched(ids, batch_size):
+            placeholders = ", ".join("?" * len(batch))
+            for row in conn.execute(sql.format(placeholders=placeholders), batch):
+                grouped[row[key]].append(row)
+    return grouped
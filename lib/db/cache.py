@@ -0,0 +1,232 @@
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from lib.db.connection import connection, get_pool, in_transaction, on_reconfigure, on_rollback
+
+_caches = weakref.WeakSet()
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU cache with a per-entry TTL.
+
+    Entries are tagged with the id of the row they came from, so every key
+    that resolved to a row (by id, by name, ...) can be dropped when that row
+    is written. None is a legitimate cached value: it records a miss.
+
+    Inside transaction() the cache is bypassed, since the block may see its
+    own uncommitted rows. A value loaded while an invalidation happened is
+    returned but not stored, as it may predate the write.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_row = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._generation = 0
+        _caches.add(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def configure(self, maxsize=None, ttl=None):
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if ttl is not None:
+            self.ttl = ttl
+        self.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+    def get_or_load(self, key, loader, row_id=None):
+        """Return the cached value for key, calling loader() on a miss.
+
+        The loaded value is tagged with row_id, or with value['id'] when the
+        loader found a row.
+        """
+        if self.maxsize <= 0 or in_transaction():
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires, _ = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+        value = loader()
+        if row_id is None and value is not None:
+            row_id = value['id']
+        self._put(key, value, row_id, now + self.ttl, generation)
+        return value
+
+    def _put(self, key, value, row_id, expires, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires, row_id)
+            if row_id is not None:
+                self._keys_by_row.setdefault(row_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, row_id = self._entries.pop(key)
+        keys = self._keys_by_row.get(row_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_row[row_id]
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_row(self, row_id):
+        """Drop every entry that resolved to row_id."""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._keys_by_row.get(row_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_row.clear()
+
+
+class ResultCache:
+    """Caches query results until one of the tables they read from changes.
+
+    Model writes bump a per-table version, so only results that depend on the
+    written table are recomputed. Writes made elsewhere (another process, raw
+    SQL on another connection) are caught by polling PRAGMA data_version on a
+    dedicated read-only connection, at most once per poll_interval seconds.
+    When it moves, the table_versions counters from migration 007 say which
+    tables changed, and only those are bumped; for this process's own
+    commits that repeats the bump the model write made. Without migration
+    007 any change, ours included, invalidates every result. Pass
+    watch_external=False in single-process setups where all writes go
+    through the models.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, watch_external=True, poll_interval=0.1):
+        self.watch_external = watch_external
+        self.poll_interval = poll_interval
+        self._lru = LRUCache(maxsize, ttl)
+        self._versions = {}
+        self._epoch = 0
+        self._watcher = None
+        self._watched_database = None
+        self._data_version = None
+        self._table_versions = None
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize=None, ttl=None):
+        self._lru.configure(maxsize, ttl)
+
+    def stats(self):
+        return self._lru.stats()
+
+    def clear(self):
+        self._lru.clear()
+
+    def bump(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def _check_external(self):
+        database = get_pool().database
+        now = time.monotonic()
+        if now < self._next_poll and database == self._watched_database:
+            return
+        with self._lock:
+            if self._watched_database != database:
+                if self._watcher is not None:
+                    self._watcher.close()
+                self._watcher = sqlite3.connect(database, check_same_thread=False)
+                self._watched_database = database
+                self._data_version = None
+                self._table_versions = None
+            self._next_poll = now + self.poll_interval
+            # Read data_version before the counters: a commit landing in
+            # between is then seen in the counters now and checked again on
+            # the next poll, instead of being missed.
+            data_version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+            try:
+                table_versions = dict(self._watcher.execute("SELECT name, version FROM table_versions"))
+            except sqlite3.OperationalError:
+                table_versions = None
+            if table_versions is None or self._table_versions is None:
+                self._epoch += 1
+            else:
+                for table, version in table_versions.items():
+                    if version != self._table_versions.get(table):
+                        self._versions[table] = self._versions.get(table, 0) + 1
+            self._table_versions = table_versions
+
+    def rows(self, tables, sql, params=()):
+        """Return the rows for sql, from cache while none of tables has changed."""
+        if in_transaction():
+            with connection() as conn:
+                return conn.execute(sql, params).fetchall()
+        if self.watch_external:
+            self._check_external()
+        with self._lock:
+            versions = tuple(self._versions.get(table, 0) for table in tables)
+            key = (sql, tuple(params), self._epoch, versions)
+
+        def load():
+            with connection() as conn:
+                return conn.execute(sql, params).fetchall()
+        return self._lru.get_or_load(key, load, row_id=tuple(tables))
+
+
+results = ResultCache()
+
+@on_rollback
+@on_reconfigure
+def clear_all():
+    """Drop every cached value.
+
+    Runs after a transaction() rollback, since rows read inside it may never
+    have existed, and after configure(), since cached rows belong to the old
+    database.
+    """
+    for cache in list(_caches):
+        cache.clear()
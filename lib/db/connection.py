@@ -1,6 +1,431 @@
+import asyncio
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DATABASE = 'articles.db'
+
+PROFILES = {
+    'default': {},
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+    'throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456,
+        'cache_size': -65536,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'readonly-analytics': {
+        'query_only': 'ON',
+        'mmap_size': 1073741824,
+        'cache_size': -262144,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+    },
+}
+
+
+def apply_profile(conn, profile):
+    if profile not in PROFILES:
+        raise ValueError(f"unknown connection profile {profile!r}, expected one of {sorted(PROFILES)}")
+    for pragma, value in PROFILES[profile].items():
+        conn.execute(f"PRAGMA {pragma} = {value}").fetchall()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection(sqlite3.Connection):
+    """A sqlite3 connection whose close() hands it back to its pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.checked_out = False
+        self.scoped = False
+        self.owner = None
+        self.transaction_depth = 0
+        self.last_used = time.monotonic()
+        self._after_commit = []
+        self._after_rollback = []
+
+    def commit(self):
+        super().commit()
+        self._after_rollback = []
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        # ROLLBACK as a statement: before Python 3.10, Connection.rollback()
+        # also resets every cursor of the connection, which kills an
+        # iter_rows() stream running in the same scope.
+        if self.in_transaction:
+            self.execute("ROLLBACK")
+        self._after_commit = []
+        self._undo(0)
+
+    def _undo(self, depth):
+        """Run, newest first, the after_rollback() callbacks registered deeper than depth."""
+        undone = [callback for level, callback in self._after_rollback if level > depth]
+        self._after_rollback = [entry for entry in self._after_rollback if entry[0] <= depth]
+        for callback in reversed(undone):
+            callback()
+
+    def close(self):
+        if self.scoped:
+            return
+        if self.pool is None:
+            super().close()
+        elif self.checked_out:
+            self.pool.release(self)
+
+    def discard(self):
+        self.pool = None
+        super().close()
+
+
+class ConnectionPool:
+    def __init__(self, database=DATABASE, max_size=5, idle_timeout=300, timeout=10, profile=None):
+        if profile is None:
+            profile = os.environ.get('ARTICLES_DB_PROFILE', 'default')
+        if profile not in PROFILES:
+            raise ValueError(f"unknown connection profile {profile!r}, expected one of {sorted(PROFILES)}")
+        self.database = database
+        self.profile = profile
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, factory=PooledConnection, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            apply_profile(conn, self.profile)
+            for hook in _connect_hooks:
+                hook(conn)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        conn.pool = self
+        return conn
+
+    def _healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        fresh = []
+        for conn in self._idle:
+            if now - conn.last_used > self.idle_timeout:
+                self._size -= 1
+                conn.discard()
+            else:
+                fresh.append(conn)
+        self._idle = fresh
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                self._evict_idle()
+                while self._idle:
+                    conn = self._idle.pop()
+                    if self._healthy(conn):
+                        conn.checked_out = True
+                        return conn
+                    self._size -= 1
+                    conn.discard()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"no connection available after {self.timeout}s")
+                self._cond.wait(remaining)
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        conn.checked_out = True
+        return conn
+
+    def release(self, conn):
+        conn.checked_out = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            with self._cond:
+                self._size -= 1
+                conn.discard()
+                self._cond.notify()
+            return
+        conn.last_used = time.monotonic()
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.discard()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            for conn in self._idle:
+                self._size -= 1
+                conn.discard()
+            self._idle = []
+            self._closed = True
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_scoped_connection = ContextVar('scoped_connection', default=None)
+_reconfigure_hooks = []
+_connect_hooks = []
+_rollback_hooks = []
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def configure(**options):
+    """Replace the shared pool, e.g. configure(database='test.db', profile='throughput').
+
+    The profile defaults to $ARTICLES_DB_PROFILE, falling back to 'default'
+    (plain SQLite settings).
+    """
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, ConnectionPool(**options)
+    if old is not None:
+        old.close_all()
+    for hook in _reconfigure_hooks:
+        hook()
+    return _pool
+
+
+def on_reconfigure(hook):
+    """Register hook() to run after configure() swaps in a new pool."""
+    _reconfigure_hooks.append(hook)
+    return hook
+
+
+def on_connect(hook):
+    """Register hook(conn) to run on every new pooled connection, after its profile."""
+    _connect_hooks.append(hook)
+    return hook
+
+
+def on_rollback(hook):
+    """Register hook() to run whenever a transaction() block rolls back."""
+    _rollback_hooks.append(hook)
+    return hook
+
+
+def _owner():
+    """The asyncio task running this code, or else the id of this thread."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task if task is not None else threading.get_ident()
+
+
+def _scoped():
+    """The scope() connection of this thread or asyncio task, if any.
+
+    Tasks inherit the ContextVar of the code that created them, but not its
+    connection: a child task sharing it would commit or roll back its
+    parent's transaction. A connection is only used by its owner.
+    """
+    conn = _scoped_connection.get()
+    if conn is not None and conn.owner == _owner():
+        return conn
+    return None
+
+
+def in_transaction():
+    """True inside a transaction() block in this thread or asyncio task."""
+    conn = _scoped()
+    return conn is not None and conn.transaction_depth > 0
+
+
+def after_commit(callback):
+    """Run callback() once the enclosing transaction() commits, or now outside one.
+
+    A rollback drops it. Used for cache invalidation, so other threads cannot
+    load the old rows back into a cache before the new ones are visible.
+    """
+    if in_transaction():
+        _scoped()._after_commit.append(callback)
+    else:
+        callback()
+
+
+def after_rollback(callback):
+    """Run callback() if the enclosing transaction() block, or the savepoint
+    it is in, rolls back. Outside one the write has committed, so it is dropped.
+
+    Models use it to undo in-memory state, such as the id of a rolled-back insert.
+    """
+    conn = _scoped()
+    if conn is not None and conn.transaction_depth > 0:
+        conn._after_rollback.append((conn.transaction_depth, callback))
+
 
 def get_connection():
-	conn = sqlite3.connect('articles.db')
-	conn.row_factory = sqlite3.Row 
-	return conn
\ No newline at end of file
+    conn = _scoped()
+    if conn is not None:
+        return conn
+    return get_pool().acquire()
+
+
+@contextmanager
+def scope():
+    """Share one connection between every model call made in this thread or asyncio task.
+
+    Nested scopes reuse the outer connection; it goes back to the pool when the
+    outermost scope exits. Tasks started inside a scope get their own.
+    """
+    conn = _scoped()
+    if conn is not None:
+        yield conn
+        return
+    conn = get_pool().acquire()
+    conn.scoped = True
+    conn.owner = _owner()
+    token = _scoped_connection.set(conn)
+    try:
+        yield conn
+    finally:
+        try:
+            _scoped_connection.reset(token)
+        finally:
+            # Return the connection even when a generator holding the scope
+            # is closed from another context and the reset fails.
+            conn.scoped = False
+            conn.owner = None
+            conn.close()
+
+
+@contextmanager
+def connection():
+    """Check out a pooled connection, commit on success and roll back on error.
+
+    Inside transaction() the enclosing block decides instead.
+    """
+    conn = get_connection()
+    if conn.transaction_depth:
+        yield conn
+        return
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaction():
+    """Run the block as one transaction; model calls inside share its connection.
+
+    Nested transaction() blocks become SAVEPOINTs, so an inner failure rolls
+    back only the inner work and can be caught without losing the outer work.
+    If the final COMMIT fails, the transaction is rolled back, not left open.
+    """
+    with scope() as conn:
+        depth = conn.transaction_depth
+        savepoint = f"sp_{depth}"
+        conn.execute("BEGIN" if depth == 0 else f"SAVEPOINT {savepoint}")
+        conn.transaction_depth += 1
+        try:
+            yield conn
+        except BaseException:
+            conn.transaction_depth -= 1
+            _rollback(conn, None if depth == 0 else savepoint)
+            raise
+        conn.transaction_depth -= 1
+        if depth:
+            conn.execute(f"RELEASE {savepoint}")
+            return
+        try:
+            conn.commit()
+        except BaseException:
+            _rollback(conn, None)
+            raise
+
+
+def _rollback(conn, savepoint):
+    if savepoint is None:
+        conn.rollback()
+    else:
+        conn.execute(f"ROLLBACK TO {savepoint}")
+        conn.execute(f"RELEASE {savepoint}")
+        conn._undo(conn.transaction_depth)
+    for hook in _rollback_hooks:
+        hook()
+
+
+def iter_rows(sql, params=(), chunk_size=1000):
+    """Yield rows for a query, fetching chunk_size at a time so memory stays flat.
+
+    Inside a scope() the stream runs on the scope's connection, so model
+    writes made while iterating can commit; on a second connection the
+    rollback journal would block them behind the stream's read lock.
+    Otherwise the stream checks out a connection of its own until it is
+    exhausted or closed. It never opens a scope itself, because a generator
+    can be interleaved with other code, or closed from another thread.
+    """
+    conn = _scoped()
+    owned = conn is None
+    if owned:
+        conn = get_pool().acquire()
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        if owned:
+            conn.close()
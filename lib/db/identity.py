@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_identity_map = ContextVar('identity_map', default=None)
+
+
+@contextmanager
+def identity_map():
+    """Within this block, each (model class, id) pair maps to one instance.
+
+    Finders return the already-loaded instance instead of building a new one,
+    and find_by_id skips the query entirely for ids already in the map.
+    Nested blocks share the outer map.
+    """
+    current = _identity_map.get()
+    if current is not None:
+        yield current
+        return
+    token = _identity_map.set({})
+    try:
+        yield _identity_map.get()
+    finally:
+        _identity_map.reset(token)
+
+
+def get(cls, id):
+    current = _identity_map.get()
+    if current is None:
+        return None
+    return current.get((cls, id))
+
+
+def add(obj):
+    """Register obj and return the canonical instance for its (class, id)."""
+    current = _identity_map.get()
+    if current is None or obj.id is None:
+        return obj
+    return current.setdefault((type(obj), obj.id), obj)
+
+
+def discard(obj):
+    current = _identity_map.get()
+    if current is not None:
+        current.pop((type(obj), obj.id), None)
@@ -0,0 +1,128 @@
+import asyncio
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from lib.db import aio
+
+_batch = ContextVar('loader_batch', default=None)
+_async_loaders = weakref.WeakKeyDictionary()
+
+
+class Pending:
+    """A queued find_by_id; result() resolves the whole batch it belongs to."""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._done = False
+        self._value = None
+
+    def _resolve(self, value):
+        self._value = value
+        self._done = True
+
+    def result(self):
+        if not self._done:
+            self._loader.dispatch()
+        return self._value
+
+
+class Loader:
+    """Collects ids for one model and resolves them with a single find_by_ids call."""
+
+    def __init__(self, model):
+        self.model = model
+        self._queue = {}
+
+    def load(self, id):
+        pending = self._queue.get(id)
+        if pending is None:
+            pending = self._queue[id] = Pending(self)
+        return pending
+
+    def dispatch(self):
+        queue, self._queue = self._queue, {}
+        if not queue:
+            return
+        found = self.model.find_by_ids(queue)
+        for id, pending in queue.items():
+            pending._resolve(found.get(id))
+
+
+@contextmanager
+def batch():
+    """Coalesce Model.load(id) calls made inside the block.
+
+    Ids are deduplicated per model and fetched with one WHERE id IN (...)
+    query, either when the first result() is asked for or when the block
+    exits.
+    """
+    loaders = {}
+    token = _batch.set(loaders)
+    try:
+        yield loaders
+        for loader in loaders.values():
+            loader.dispatch()
+    finally:
+        _batch.reset(token)
+
+
+def load(model, id):
+    loaders = _batch.get()
+    if loaders is None:
+        return Loader(model).load(id)
+    loader = loaders.get(model)
+    if loader is None:
+        loader = loaders[model] = Loader(model)
+    return loader.load(id)
+
+
+class AsyncLoader:
+    """Collects the ids requested during one event-loop iteration and resolves
+    them with one find_by_ids call on the lib.db.aio executor.
+
+    Each caller gets its own future, so one caller timing out or being
+    cancelled does not cancel the others waiting on the same id. The loader
+    keeps no reference to its loop, which would keep the loop alive through
+    the weak per-loop registry.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._queue = {}
+
+    def load(self, id):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._queue:
+            loop.call_soon(self._dispatch, loop)
+        self._queue.setdefault(id, []).append(future)
+        return future
+
+    def _dispatch(self, loop):
+        queue, self._queue = self._queue, {}
+        fetch = loop.create_task(aio.run(self.model.find_by_ids, list(queue)))
+
+        def resolve(fetch):
+            for id, futures in queue.items():
+                for future in futures:
+                    if future.done():
+                        continue
+                    if fetch.cancelled():
+                        future.cancel()
+                    elif fetch.exception() is not None:
+                        future.set_exception(fetch.exception())
+                    else:
+                        future.set_result(fetch.result().get(id))
+        fetch.add_done_callback(resolve)
+
+
+def aload(model, id):
+    """Return an awaitable for model.find_by_id(id), coalesced with every other
+    aload() for the same model in this event-loop iteration."""
+    loop = asyncio.get_running_loop()
+    loaders = _async_loaders.setdefault(loop, {})
+    loader = loaders.get(model)
+    if loader is None:
+        loader = loaders[model] = AsyncLoader(model)
+    return loader.load(id)
@@ -0,0 +1,106 @@
+import threading
+from pathlib import Path
+
+from lib.db.connection import connection, get_pool
+
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+
+_known_tables = {}
+_known_tables_lock = threading.Lock()
+
+
+class MigrationError(Exception):
+    """The data needs fixing by hand before a migration can apply."""
+
+
+def migrations():
+    """Return (version, path) for every migration file, oldest first."""
+    found = []
+    for path in MIGRATIONS_DIR.glob('*.sql'):
+        found.append((int(path.name.split('_', 1)[0]), path))
+    return sorted(found)
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """Apply pending migrations in order, each in its own transaction.
+
+    The applied version is stored in PRAGMA user_version.
+    """
+    applied = []
+    for version, path in migrations():
+        if version <= current_version(conn):
+            continue
+        if target is not None and version > target:
+            break
+        check = PRECHECKS.get(version)
+        if check is not None:
+            check(conn)
+        script = path.read_text()
+        try:
+            conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;")
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        applied.append(version)
+    if applied:
+        forget_tables()
+    return applied
+
+
+def _check_unique_names(conn):
+    duplicates = []
+    for table in ('authors', 'magazines'):
+        rows = conn.execute(
+            f"SELECT name, COUNT(*) FROM {table} GROUP BY name HAVING COUNT(*) > 1 ORDER BY name"
+        ).fetchall()
+        duplicates.extend(f"{table}: {name!r} x{count}" for name, count in rows)
+    if duplicates:
+        raise MigrationError(
+            "merge or rename the duplicate names before migration 003 adds unique indexes: "
+            + ", ".join(duplicates)
+        )
+
+
+# Checks run before the migration of the same version is applied.
+PRECHECKS = {
+    3: _check_unique_names,
+}
+
+
+def has_table(name):
+    """Whether the current database has table name, e.g. one added by a migration.
+
+    Models use this to prefer migrated structures and fall back to plain
+    queries on databases built from schema.sql alone. Answers are cached per
+    database until migrate() or forget_tables() runs.
+    """
+    return _has('table', name)
+
+
+def has_index(name):
+    """Like has_table(), for an index such as ux_authors_name."""
+    return _has('index', name)
+
+
+def _has(type, name):
+    key = (get_pool().database, type, name)
+    with _known_tables_lock:
+        if key in _known_tables:
+            return _known_tables[key]
+    with connection() as conn:
+        found = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (type, name)
+        ).fetchone() is not None
+    with _known_tables_lock:
+        _known_tables[key] = found
+    return found
+
+
+def forget_tables():
+    with _known_tables_lock:
+        _known_tables.clear()
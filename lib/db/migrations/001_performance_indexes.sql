@@ -0,0 +1,13 @@
+-- Relationship lookups: Author.articles(), Author.magazines(), Author.topic_areas()
+-- are served by (author_id, magazine_id); Magazine.articles(), contributors(),
+-- contributing_authors() and top_publisher() by (magazine_id, author_id).
+-- They cover only the join/filter columns: queries that group or count by
+-- them (topic_areas(), top_publisher()) stay in the index, while SELECT *
+-- queries such as articles() and contributors() still read each matching row.
+CREATE INDEX IF NOT EXISTS idx_articles_author_magazine ON articles (author_id, magazine_id);
+CREATE INDEX IF NOT EXISTS idx_articles_magazine_author ON articles (magazine_id, author_id);
+
+-- Natural-key finders.
+CREATE INDEX IF NOT EXISTS idx_authors_name ON authors (name);
+CREATE INDEX IF NOT EXISTS idx_magazines_name ON magazines (name);
+CREATE INDEX IF NOT EXISTS idx_magazines_category ON magazines (category);
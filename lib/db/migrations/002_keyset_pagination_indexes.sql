@@ -0,0 +1,4 @@
+-- Keyset pagination over an author's or magazine's articles seeks on
+-- (foreign key, id), so deep pages cost the same as the first one.
+CREATE INDEX IF NOT EXISTS idx_articles_author_id ON articles (author_id, id);
+CREATE INDEX IF NOT EXISTS idx_articles_magazine_id ON articles (magazine_id, id);
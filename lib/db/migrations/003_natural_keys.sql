@@ -0,0 +1,9 @@
+-- Authors and magazines are identified by name, which lets ingestion use
+-- INSERT ... ON CONFLICT (see Model._insert_or_select / Magazine.upsert).
+-- migrate() refuses to run this while duplicate names exist.
+
+-- The unique indexes replace the plain name indexes from 001.
+DROP INDEX IF EXISTS idx_authors_name;
+DROP INDEX IF EXISTS idx_magazines_name;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_authors_name ON authors (name);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_magazines_name ON magazines (name);
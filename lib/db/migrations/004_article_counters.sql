@@ -0,0 +1,68 @@
+-- Article counts per magazine and per (author, magazine) pair, kept current
+-- by triggers on articles so Magazine.top_publisher() and
+-- Magazine.contributing_authors() become index lookups instead of
+-- GROUP BY scans over every article.
+CREATE TABLE IF NOT EXISTS magazine_article_counts (
+    magazine_id INTEGER PRIMARY KEY,
+    article_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_magazine_article_counts_rank
+    ON magazine_article_counts (article_count DESC, magazine_id);
+
+-- One row per distinct (author, magazine) pair that has at least one article.
+CREATE TABLE IF NOT EXISTS author_magazine_counts (
+    author_id INTEGER NOT NULL,
+    magazine_id INTEGER NOT NULL,
+    article_count INTEGER NOT NULL,
+    PRIMARY KEY (author_id, magazine_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_author_magazine_counts_magazine
+    ON author_magazine_counts (magazine_id, article_count, author_id);
+
+DELETE FROM magazine_article_counts;
+INSERT INTO magazine_article_counts (magazine_id, article_count)
+    SELECT id, (SELECT COUNT(*) FROM articles WHERE magazine_id = magazines.id) FROM magazines;
+DELETE FROM author_magazine_counts;
+INSERT INTO author_magazine_counts (author_id, magazine_id, article_count)
+    SELECT author_id, magazine_id, COUNT(*) FROM articles GROUP BY author_id, magazine_id;
+
+CREATE TRIGGER IF NOT EXISTS magazines_counts_insert AFTER INSERT ON magazines BEGIN
+    INSERT OR IGNORE INTO magazine_article_counts (magazine_id, article_count) VALUES (NEW.id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS magazines_counts_delete AFTER DELETE ON magazines BEGIN
+    DELETE FROM magazine_article_counts WHERE magazine_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_counts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO magazine_article_counts (magazine_id, article_count) VALUES (NEW.magazine_id, 1)
+        ON CONFLICT (magazine_id) DO UPDATE SET article_count = article_count + 1;
+    INSERT INTO author_magazine_counts (author_id, magazine_id, article_count)
+        VALUES (NEW.author_id, NEW.magazine_id, 1)
+        ON CONFLICT (author_id, magazine_id) DO UPDATE SET article_count = article_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_counts_delete AFTER DELETE ON articles BEGIN
+    UPDATE magazine_article_counts SET article_count = article_count - 1
+        WHERE magazine_id = OLD.magazine_id;
+    UPDATE author_magazine_counts SET article_count = article_count - 1
+        WHERE author_id = OLD.author_id AND magazine_id = OLD.magazine_id;
+    DELETE FROM author_magazine_counts
+        WHERE author_id = OLD.author_id AND magazine_id = OLD.magazine_id AND article_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_counts_update AFTER UPDATE OF author_id, magazine_id ON articles
+WHEN OLD.author_id IS NOT NEW.author_id OR OLD.magazine_id IS NOT NEW.magazine_id
+BEGIN
+    UPDATE magazine_article_counts SET article_count = article_count - 1
+        WHERE magazine_id = OLD.magazine_id;
+    UPDATE author_magazine_counts SET article_count = article_count - 1
+        WHERE author_id = OLD.author_id AND magazine_id = OLD.magazine_id;
+    DELETE FROM author_magazine_counts
+        WHERE author_id = OLD.author_id AND magazine_id = OLD.magazine_id AND article_count <= 0;
+    INSERT INTO magazine_article_counts (magazine_id, article_count) VALUES (NEW.magazine_id, 1)
+        ON CONFLICT (magazine_id) DO UPDATE SET article_count = article_count + 1;
+    INSERT INTO author_magazine_counts (author_id, magazine_id, article_count)
+        VALUES (NEW.author_id, NEW.magazine_id, 1)
+        ON CONFLICT (author_id, magazine_id) DO UPDATE SET article_count = article_count + 1;
+END;
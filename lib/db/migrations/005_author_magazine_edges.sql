@@ -0,0 +1,5 @@
+-- author_magazine_counts (migration 004) doubles as the deduplicated
+-- author/magazine edge table. Its primary key serves lookups by author in
+-- magazine order; this index serves lookups by magazine in author order.
+CREATE INDEX IF NOT EXISTS idx_author_magazine_counts_contributors
+    ON author_magazine_counts (magazine_id, author_id);
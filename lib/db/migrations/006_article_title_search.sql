@@ -0,0 +1,24 @@
+-- Full-text index over article titles for Article.search(). It is an
+-- external-content table: titles are stored once, in articles, and the
+-- triggers below keep the index in sync. prefix='2 3' adds prefix indexes
+-- so short "term*" queries avoid a full term scan.
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title,
+    content = 'articles',
+    content_rowid = 'id',
+    prefix = '2 3'
+);
+INSERT INTO articles_fts (articles_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title) VALUES (NEW.id, NEW.title);
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+    INSERT INTO articles_fts (rowid, title) VALUES (NEW.id, NEW.title);
+END;
@@ -0,0 +1,38 @@
+-- A write counter per model table, bumped by triggers on every row written
+-- through any connection. ResultCache reads it when PRAGMA data_version says
+-- another connection committed, to tell which tables that commit touched.
+CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO table_versions (name) VALUES ('authors'), ('magazines'), ('articles');
+
+CREATE TRIGGER IF NOT EXISTS authors_version_insert AFTER INSERT ON authors BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'authors';
+END;
+CREATE TRIGGER IF NOT EXISTS authors_version_update AFTER UPDATE ON authors BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'authors';
+END;
+CREATE TRIGGER IF NOT EXISTS authors_version_delete AFTER DELETE ON authors BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'authors';
+END;
+
+CREATE TRIGGER IF NOT EXISTS magazines_version_insert AFTER INSERT ON magazines BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'magazines';
+END;
+CREATE TRIGGER IF NOT EXISTS magazines_version_update AFTER UPDATE ON magazines BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'magazines';
+END;
+CREATE TRIGGER IF NOT EXISTS magazines_version_delete AFTER DELETE ON magazines BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'magazines';
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_version_insert AFTER INSERT ON articles BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'articles';
+END;
+CREATE TRIGGER IF NOT EXISTS articles_version_update AFTER UPDATE ON articles BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'articles';
+END;
+CREATE TRIGGER IF NOT EXISTS articles_version_delete AFTER DELETE ON articles BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'articles';
+END;
@@ -0,0 +1,62 @@
+import base64
+import binascii
+
+from lib.db.connection import connection
+
+
+class Page:
+    """One page of a keyset-paginated query, ordered by id."""
+
+    def __init__(self, items, next_after_id=None):
+        self.items = items
+        self.next_after_id = next_after_id
+
+    @property
+    def has_next(self):
+        return self.next_after_id is not None
+
+    @property
+    def cursor(self):
+        """Opaque token for the next page, or None on the last page."""
+        if self.next_after_id is None:
+            return None
+        return encode_cursor(self.next_after_id)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(after_id):
+    return base64.urlsafe_b64encode(f"id:{after_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        prefix, after_id = raw.split(":", 1)
+        if prefix != "id":
+            raise ValueError
+        return int(after_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"invalid page cursor {token!r}") from None
+
+
+def paginate(sql, params, build, after_id=None, limit=50, cursor=None):
+    """Run a keyset query and wrap the result in a Page.
+
+    sql must end with "... id > ? ORDER BY id LIMIT ?"; params are the values
+    for the placeholders before those two. One extra row is fetched to tell
+    whether another page exists, so no COUNT or OFFSET is ever needed.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    if cursor is not None:
+        after_id = decode_cursor(cursor)
+    with connection() as conn:
+        rows = conn.execute(sql, (*params, after_id or 0, limit + 1)).fetchall()
+    items = [build(row) for row in rows[:limit]]
+    next_after_id = items[-1].id if len(rows) > limit else None
+    return Page(items, next_after_id)
@@ -0,0 +1,167 @@
+"""Retry model writes that fail with "database is locked".
+
+SQLite's busy_timeout makes one statement wait for a lock. It gives up early
+when waiting could deadlock, and it cannot help once the timeout runs out.
+@retrying re-runs the whole write with exponential backoff and jitter
+until it succeeds or max_wait seconds have passed. It only retries
+outside transaction() blocks: a failed attempt there has already rolled
+back work that only the block's owner can redo.
+
+metrics counts contended writes and records their lock waits in a
+histogram. Use it to size writer concurrency.
+
+Bulk inserts stream their rows and cannot be re-run. They take the write
+lock up front with begin_immediate() instead.
+"""
+import functools
+import random
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+
+from lib.db.connection import in_transaction, on_connect
+
+_active = ContextVar('retry_active', default=False)
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_locked(exc):
+    return isinstance(exc, sqlite3.OperationalError) and str(exc).startswith(LOCKED_MESSAGES)
+
+
+class RetryPolicy:
+    """busy_timeout is in milliseconds and applies to connections opened afterwards.
+
+    None keeps the profile's value, or the driver's 5 seconds if the profile
+    sets none.
+    """
+
+    def __init__(self, busy_timeout=None, initial_backoff=0.01, max_backoff=1.0,
+                 multiplier=2.0, jitter=0.5, max_wait=30.0):
+        self.busy_timeout = busy_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_wait = max_wait
+
+    def backoff(self, attempt):
+        """Seconds to sleep before retry number attempt (1-based)."""
+        delay = min(self.max_backoff, self.initial_backoff * self.multiplier ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+
+class LockMetrics:
+    """Counters and a lock-wait histogram for writes run through @retrying."""
+
+    # Upper bounds, in seconds, of the wait histogram buckets.
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, float('inf'))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.writes = 0
+            self.contended = 0
+            self.retries = 0
+            self.failures = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.histogram = [0] * len(self.BUCKETS)
+
+    def record(self, retries, waited, failed):
+        with self._lock:
+            self.writes += 1
+            if not retries and not failed:
+                return
+            self.contended += 1
+            self.retries += retries
+            self.failures += failed
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            for i, bound in enumerate(self.BUCKETS):
+                if waited <= bound:
+                    self.histogram[i] += 1
+                    break
+
+    def stats(self):
+        with self._lock:
+            return {
+                'writes': self.writes,
+                'contended': self.contended,
+                'retries': self.retries,
+                'failures': self.failures,
+                'wait_seconds': self.wait_seconds,
+                'max_wait_seconds': self.max_wait_seconds,
+                'wait_histogram': dict(zip(self.BUCKETS, self.histogram)),
+            }
+
+
+policy = RetryPolicy()
+metrics = LockMetrics()
+
+
+def configure_retry(**options):
+    """Replace the retry policy, e.g. configure_retry(busy_timeout=2000, max_wait=10)."""
+    global policy
+    policy = RetryPolicy(**options)
+    return policy
+
+
+@on_connect
+def _apply_busy_timeout(conn):
+    if policy.busy_timeout is not None:
+        conn.execute(f"PRAGMA busy_timeout = {int(policy.busy_timeout)}").fetchall()
+
+
+def retrying(fn):
+    """Re-run fn under the current policy when it fails because the database is locked.
+
+    Nested @retrying calls run once and leave the retrying to the outermost one.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _active.get() or in_transaction():
+            return fn(*args, **kwargs)
+        return call(fn, *args, **kwargs)
+    return wrapper
+
+
+def call(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs), retrying with backoff while the database is locked."""
+    token = _active.set(True)
+    current = policy
+    start = time.monotonic()
+    retries = 0
+    waited = 0.0
+    try:
+        while True:
+            attempt_start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except sqlite3.OperationalError as exc:
+                if not is_locked(exc):
+                    raise
+                waited += time.monotonic() - attempt_start
+                delay = current.backoff(retries + 1)
+                if time.monotonic() + delay - start > current.max_wait:
+                    metrics.record(retries, waited, True)
+                    raise
+                time.sleep(delay)
+                waited += delay
+                retries += 1
+                continue
+            metrics.record(retries, waited, False)
+            return result
+    finally:
+        _active.reset(token)
+
+
+def begin_immediate(conn):
+    """Take the write lock before a write that cannot be re-run, such as one
+    consuming a generator, retrying under the policy while it is held elsewhere."""
+    call(conn.execute, "BEGIN IMMEDIATE")
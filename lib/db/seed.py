@@ -13,26 +13,28 @@ def seed_database():
     conn.close()
 
     # Create authors
-    author1 = Author.create("Kelly Brian")
-    author2 = Author.create("Mwarika Mwaura")
-    author3 = Author.create("Bob Johnson")
+    kelly, mwarika, bob = Author.bulk_create(["Kelly Brian", "Mwarika Mwaura", "Bob Johnson"])
 
     # Create magazines
-    magazine1 = Magazine.create("Tech Today", "Technology")
-    magazine2 = Magazine.create("Science Weekly", "Science")
-    magazine3 = Magazine.create("Business Insights", "Business")
+    tech, science, business = Magazine.bulk_create([
+        ("Tech Today", "Technology"),
+        ("Science Weekly", "Science"),
+        ("Business Insights", "Business"),
+    ])
 
     # Create articles
-    Article.create("Python Programming", author1, magazine1)
-    Article.create("Machine Learning", author1, magazine1)
-    Article.create("Quantum Physics", author2, magazine2)
-    Article.create("Neuroscience", author2, magazine2)
-    Article.create("Stock Market", author3, magazine3)
-    Article.create("Startup Funding", author3, magazine3)
-    Article.create("AI Ethics", author1, magazine2)
-    Article.create("Data Science", author1, magazine2)
-    Article.create("Blockchain", author2, magazine1)
-    Article.create("Cybersecurity", author3, magazine1)
+    Article.bulk_create([
+        ("Python Programming", kelly, tech),
+        ("Machine Learning", kelly, tech),
+        ("Quantum Physics", mwarika, science),
+        ("Neuroscience", mwarika, science),
+        ("Stock Market", bob, business),
+        ("Startup Funding", bob, business),
+        ("AI Ethics", kelly, science),
+        ("Data Science", kelly, science),
+        ("Blockchain", mwarika, tech),
+        ("Cybersecurity", bob, tech),
+    ])
 
 def get_connection():
     from lib.db.connection import get_connection as get_db_connection
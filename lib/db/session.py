@@ -0,0 +1,112 @@
+from contextvars import ContextVar
+from itertools import groupby
+
+from lib.db import identity
+from lib.db.connection import after_rollback, connection
+from lib.db.retry import retrying
+
+_current_session = ContextVar('session', default=None)
+
+
+def current_session():
+    return _current_session.get()
+
+
+class Session:
+    """Unit of work that batches model writes into one transaction.
+
+    Used as a context manager, save() and delete() on any model inside the
+    block are recorded instead of executed, and the whole batch is flushed on
+    exit: one executemany per model and statement shape (updates are grouped
+    by which columns changed, unchanged objects are skipped), inside a single
+    transaction that is rolled back if any statement fails. New rows get their
+    ids at commit time, so an Article created in the same session as its
+    Author must be given the author's id after the commit.
+    """
+
+    def __init__(self):
+        self.new = {}
+        self.dirty = {}
+        self.deleted = {}
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_current_session.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_session.reset(self._tokens.pop())
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def add(self, obj):
+        if obj.id is None:
+            self.new[id(obj)] = obj
+        else:
+            self.dirty[(type(obj), obj.id)] = obj
+
+    def delete(self, obj):
+        if obj.id is None:
+            self.new.pop(id(obj), None)
+            return
+        key = (type(obj), obj.id)
+        self.dirty.pop(key, None)
+        self.deleted[key] = obj
+
+    def rollback(self):
+        self.new.clear()
+        self.dirty.clear()
+        self.deleted.clear()
+
+    @retrying
+    def commit(self):
+        inserted = []
+        updated = [obj for obj in self.dirty.values() if obj.changed_columns()]
+        try:
+            with connection() as conn:
+                for cls, objs in _grouped(self.new.values()):
+                    conn.executemany(cls._insert_sql(), [obj._values() for obj in objs])
+                    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    for obj, new_id in zip(objs, range(last_id - len(objs) + 1, last_id + 1)):
+                        obj.id = new_id
+                        inserted.append(obj)
+                for sql, params in _grouped_updates(updated):
+                    conn.executemany(sql, params)
+                for cls, objs in reversed(_grouped(self.deleted.values())):
+                    conn.executemany(f"DELETE FROM {cls.table} WHERE id = ?", [(obj.id,) for obj in objs])
+        except BaseException:
+            for obj in inserted:
+                obj.id = None
+            raise
+
+        for obj in self.deleted.values():
+            identity.discard(obj)
+            after_rollback(lambda obj=obj: identity.add(obj))
+            obj._invalidate_cache()
+        for obj in inserted:
+            obj._undo_on_rollback(inserted=True)
+        for obj in updated:
+            obj._undo_on_rollback()
+        for obj in [*inserted, *updated]:
+            obj._mark_saved()
+            obj._invalidate_cache()
+            identity.add(obj)
+        self.rollback()
+
+
+def _grouped_updates(objs):
+    """One (sql, params) pair per model class and set of changed columns."""
+    statements = {}
+    for obj in objs:
+        sql, params = obj._update_statement()
+        statements.setdefault(sql, []).append(params)
+    return statements.items()
+
+
+def _grouped(objs):
+    """Group objects by model class, parents (authors, magazines) before articles."""
+    key = lambda obj: (obj.flush_order, type(obj).__name__)
+    return [(type(group[0]), group) for group in (list(g) for _, g in groupby(sorted(objs, key=key), key))]
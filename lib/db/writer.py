@@ -0,0 +1,169 @@
+"""Single-writer queue with group commit.
+
+SQLite takes one writer at a time and every commit pays for an fsync, so many
+threads each running Article.create() mostly wait on each other. submit()
+hands the write to one writer thread instead and returns a
+concurrent.futures.Future. The writer drains up to max_batch queued writes,
+waiting at most max_delay seconds for more to arrive, and runs them in one
+transaction: one lock acquisition and one fsync for the whole group.
+
+Each write runs in its own SAVEPOINT, so a failing write fails only its own
+future. A group that finds the database locked is retried as a whole under
+the lib.db.retry policy. Writes run on the writer's connection and context: an enclosing
+Session, identity map or transaction() of the caller is not seen.
+"""
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from lib.db import retry
+from lib.db.connection import ConnectionPool, _owner, _scoped_connection, get_pool, on_reconfigure, transaction
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, max_batch=256, max_delay=0.002):
+        shared = get_pool()
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pool = ConnectionPool(
+            shared.database, max_size=1, idle_timeout=float('inf'),
+            timeout=shared.timeout, profile=shared.profile,
+        )
+        self.commits = 0
+        self.writes = 0
+        self._jobs = queue.SimpleQueue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='lib.db.writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) for the writer thread; returns a Future of its result."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("write queue is closed")
+            self._jobs.put((future, fn, args, kwargs))
+        return future
+
+    def close(self):
+        """Stop accepting writes, flush the queued ones and wait for the writer to exit."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._jobs.put(_STOP)
+        self._thread.join()
+
+    def _next_batch(self):
+        job = self._jobs.get()
+        if job is _STOP:
+            return [], True
+        jobs = [job]
+        deadline = time.monotonic() + self.max_delay
+        while len(jobs) < self.max_batch:
+            try:
+                job = self._jobs.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if job is _STOP:
+                return jobs, True
+            jobs.append(job)
+        return jobs, False
+
+    def _run(self):
+        conn = self.pool.acquire()
+        conn.scoped = True
+        conn.owner = _owner()
+        _scoped_connection.set(conn)
+        try:
+            stopping = False
+            while not stopping:
+                jobs, stopping = self._next_batch()
+                if jobs:
+                    self._commit(conn, jobs)
+        finally:
+            conn.scoped = False
+            conn.close()
+            self.pool.close_all()
+
+    def _commit(self, conn, jobs):
+        jobs = [job for job in jobs if job[0].set_running_or_notify_cancel()]
+        try:
+            outcomes = retry.call(self._attempt, jobs)
+        except Exception as exc:
+            # transaction() rolls back a failed COMMIT itself; make sure nothing
+            # from this group can be committed along with the next one.
+            if conn.in_transaction:
+                conn.rollback()
+            for future, *_ in jobs:
+                future.set_exception(exc)
+            return
+        self.commits += 1
+        self.writes += len(jobs)
+        for (future, *_), (result, exc) in zip(jobs, outcomes):
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+    def _attempt(self, jobs):
+        """Run the group once. A locked database fails the whole attempt, so
+        retry.call() can run it again; the rollback has already reset the ids
+        of the objects it inserted."""
+        outcomes = []
+        with transaction():
+            for future, fn, args, kwargs in jobs:
+                try:
+                    with transaction():
+                        outcomes.append((fn(*args, **kwargs), None))
+                except Exception as exc:
+                    if retry.is_locked(exc):
+                        raise
+                    outcomes.append((None, exc))
+        return outcomes
+
+
+_writer = None
+_writer_options = {}
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteQueue(**_writer_options)
+        return _writer
+
+
+def configure_writer(**options):
+    """Replace the write queue, e.g. configure_writer(max_batch=1000, max_delay=0.01).
+
+    Writes already queued on the old one are flushed first.
+    """
+    global _writer, _writer_options
+    with _writer_lock:
+        old, _writer = _writer, None
+        _writer_options = options
+    if old is not None:
+        old.close()
+
+
+@atexit.register
+@on_reconfigure
+def _close_writer():
+    global _writer
+    with _writer_lock:
+        old, _writer = _writer, None
+    if old is not None:
+        old.close()
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the shared writer thread; returns a Future."""
+    return get_writer().submit(fn, *args, **kwargs)
@@ -11,14 +11,15 @@ def start_debug_session():
     print("Let's explore authors, magazines and articles!\n")
     print("Creating sample data...\n")
     
-    # Test data
-    kelly = Author.create("Kelly Brian")
-    mwarika = Author.create("Mwarika Mwaura")
-    bob = Author.create("Bob Johnson")
+    # Test data; get_or_create keeps repeated sessions from duplicating names,
+    # which would block the unique indexes of migration 003.
+    kelly = Author.get_or_create("Kelly Brian")[0]
+    mwarika = Author.get_or_create("Mwarika Mwaura")[0]
+    bob = Author.get_or_create("Bob Johnson")[0]
     
-    tech = Magazine.create("Tech Today", "Technology")
-    science = Magazine.create("Science Weekly", "Science")
-    business = Magazine.create("Business Insights", "Business")
+    tech = Magazine.get_or_create("Tech Today", "Technology")[0]
+    science = Magazine.get_or_create("Science Weekly", "Science")[0]
+    business = Magazine.get_or_create("Business Insights", "Business")[0]
     
     Article.create("Python Programming", kelly, tech)
     Article.create("Machine Learning", kelly, tech)
@@ -1,38 +1,46 @@
-from lib.db.connection import get_connection
+import re
+from collections import namedtuple
+
+from lib.db import identity, writer
+from lib.db.aio import async_methods
+from lib.db.bulk import bulk_insert
+from lib.db.cache import LRUCache
+from lib.db.connection import connection
+from lib.db.migrate import has_table
+from lib.models.base import Model
+
+# Lean-mode row view, see AuthorRow.
+ArticleRow = namedtuple('ArticleRow', ['id', 'title', 'author_id', 'magazine_id'])
+
+@async_methods(
+    'save', 'delete', 'create', 'bulk_create', 'preload', 'get_all', 'page',
+    'find_by_id', 'author', 'magazine', 'find_by_author', 'find_by_magazine', 'search',
+)
+class Article(Model):
+    # Read-through cache for find_by_id, keyed by ('id', id).
+    cache = LRUCache()
+
+    table = 'articles'
+    columns = ('title', 'author_id', 'magazine_id')
+    row_type = ArticleRow
+    flush_order = 1
 
-class Article:
     def __init__(self, title, author_id, magazine_id, id=None):
         self.id = id
+        self._saved = None
         self.title = title
         self.author_id = author_id
         self.magazine_id = magazine_id
+        self._related = {}
 
-    def save(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        if self.id:
-            cursor.execute(
-                "UPDATE articles SET title = ?, author_id = ?, magazine_id = ? WHERE id = ?",
-                (self.title, self.author_id, self.magazine_id, self.id)
-            )
-        else:
-            cursor.execute(
-                "INSERT INTO articles (title, author_id, magazine_id) VALUES (?, ?, ?)",
-                (self.title, self.author_id, self.magazine_id)
-            )
-            self.id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return self
-
-    def delete(self):
-        if not self.id:
-            return
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM articles WHERE id = ?", (self.id,))
-        conn.commit()
-        conn.close()
+    @classmethod
+    def from_row(cls, row):
+        cached = identity.get(cls, row['id'])
+        if cached is not None:
+            return cached
+        obj = cls(row['title'], row['author_id'], row['magazine_id'], row['id'])
+        obj._mark_saved()
+        return identity.add(obj)
 
     @classmethod
     def create(cls, title, author, magazine):
@@ -40,47 +48,126 @@ class Article:
         return article.save()
 
     @classmethod
-    def get_all(cls):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM articles")
-        rows = cursor.fetchall()
-        conn.close()
-        return [cls(row['title'], row['author_id'], row['magazine_id'], row['id']) for row in rows]
+    def submit_create(cls, title, author, magazine):
+        """create() on the lib.db.writer thread, group-committed with other queued
+        writes; returns a Future of the saved Article."""
+        return writer.submit(cls.create, title, author, magazine)
+
+    @classmethod
+    def bulk_create(cls, articles, batch_size=1000):
+        """Insert many articles in one transaction; returns their ids.
+
+        Each item is an unsaved Article or a (title, author, magazine) tuple, where
+        author and magazine are model instances or plain ids.
+        """
+        def row(article):
+            if isinstance(article, cls):
+                return (article.title, article.author_id, article.magazine_id)
+            title, author, magazine = article
+            return (title, getattr(author, 'id', author), getattr(magazine, 'id', magazine))
+        ids = bulk_insert(
+            "INSERT INTO articles (title, author_id, magazine_id) VALUES (?, ?, ?)",
+            (row(article) for article in articles),
+            batch_size
+        )
+        cls._invalidate_table()
+        return ids
+
+    @classmethod
+    def preload(cls, articles, include):
+        """Load the related rows named in include ("author", "magazine") for all
+        articles with one batched query per relation and attach them, so that
+        author() and magazine() no longer hit the database.
+        """
+        include = set(include)
+        unknown = include - {'author', 'magazine'}
+        if unknown:
+            raise ValueError(f"cannot include {sorted(unknown)}, expected 'author' or 'magazine'")
+        if 'author' in include:
+            from lib.models.author import Author
+            authors = Author.find_by_ids(article.author_id for article in articles)
+            for article in articles:
+                article._related['author'] = (article.author_id, authors.get(article.author_id))
+        if 'magazine' in include:
+            from lib.models.magazine import Magazine
+            magazines = Magazine.find_by_ids(article.magazine_id for article in articles)
+            for article in articles:
+                article._related['magazine'] = (article.magazine_id, magazines.get(article.magazine_id))
+        return articles
 
     @classmethod
-    def find_by_id(cls, id):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM articles WHERE id = ?", (id,))
-        row = cursor.fetchone()
-        conn.close()
-        if row:
-            return cls(row['title'], row['author_id'], row['magazine_id'], row['id'])
-        return None
+    def get_all(cls, include=(), lean=False):
+        """Return every article, with the related rows named in include preloaded;
+        with lean=True, return ArticleRow tuples instead."""
+        if lean and include:
+            raise ValueError("lean rows cannot carry included relations")
+        articles = super().get_all(lean)
+        return articles if lean else cls.preload(articles, include)
 
     def author(self):
         from lib.models.author import Author
+        loaded = self._related.get('author')
+        if loaded and loaded[0] == self.author_id:
+            return loaded[1]
         return Author.find_by_id(self.author_id)
 
     def magazine(self):
         from lib.models.magazine import Magazine
+        loaded = self._related.get('magazine')
+        if loaded and loaded[0] == self.magazine_id:
+            return loaded[1]
         return Magazine.find_by_id(self.magazine_id)
 
     @classmethod
-    def find_by_author(cls, author):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM articles WHERE author_id = ?", (author.id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [cls(row['title'], row['author_id'], row['magazine_id'], row['id']) for row in rows]
+    def find_by_author(cls, author, include=()):
+        with connection() as conn:
+            rows = conn.execute("SELECT * FROM articles WHERE author_id = ?", (author.id,)).fetchall()
+        return cls.preload([cls.from_row(row) for row in rows], include)
+
+    @classmethod
+    def find_by_magazine(cls, magazine, include=()):
+        with connection() as conn:
+            rows = conn.execute("SELECT * FROM articles WHERE magazine_id = ?", (magazine.id,)).fetchall()
+        return cls.preload([cls.from_row(row) for row in rows], include)
 
     @classmethod
-    def find_by_magazine(cls, magazine):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM articles WHERE magazine_id = ?", (magazine.id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [cls(row['title'], row['author_id'], row['magazine_id'], row['id']) for row in rows]
\ No newline at end of file
+    def search(cls, query, limit=20, magazine=None, author=None, prefix=True):
+        """Find articles whose title matches every word in query, best matches first.
+
+        With prefix=True the last word also matches longer words ("pyth" finds
+        "Python"). Results are ranked by bm25 through the articles_fts index
+        from migration 006; without it this falls back to an unranked LIKE
+        scan that matches substrings.
+        """
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        filters, params = [], []
+        if magazine is not None:
+            filters.append("articles.magazine_id = ?")
+            params.append(getattr(magazine, 'id', magazine))
+        if author is not None:
+            filters.append("articles.author_id = ?")
+            params.append(getattr(author, 'id', author))
+        where = "".join(f" AND {condition}" for condition in filters)
+
+        if has_table('articles_fts'):
+            match = " ".join(f'"{term}"' for term in terms)
+            if prefix:
+                match += "*"
+            sql = f"""
+                SELECT articles.* FROM articles_fts
+                JOIN articles ON articles.id = articles_fts.rowid
+                WHERE articles_fts MATCH ?{where}
+                ORDER BY bm25(articles_fts)
+                LIMIT ?
+            """
+            params = [match, *params, limit]
+        else:
+            patterns = [f"%{term}%" for term in terms]
+            likes = " AND ".join("articles.title LIKE ?" for _ in terms)
+            sql = f"SELECT * FROM articles WHERE {likes}{where} ORDER BY id LIMIT ?"
+            params = [*patterns, *params, limit]
+        with connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [cls.from_row(row) for row in rows]
@@ -1,30 +1,54 @@
-from lib.db.connection import get_connection
+from collections import namedtuple
+
+from lib.db import identity
+from lib.db.aio import async_methods
+from lib.db.bulk import bulk_insert, bulk_upsert, fetch_grouped
+from lib.db.cache import LRUCache, results
+from lib.db.connection import connection, iter_rows
+from lib.db.migrate import has_table
+from lib.db.pagination import paginate
+from lib.db.retry import retrying
+from lib.models.base import Model
+
+# Read-only tuple view of a row, returned by the finders in lean mode. It has no
+# per-instance __dict__, so a million of them take about a third less memory
+# than the equivalent model instances (see scripts/benchmark_memory.py).
+AuthorRow = namedtuple('AuthorRow', ['id', 'name'])
+
+# afind_by_id(), asave(), aarticles(), ... are coroutine versions of these
+# methods that run on the lib.db.aio executor.
+@async_methods(
+    'save', 'delete', 'create', 'bulk_create', 'get_or_create', 'upsert', 'bulk_upsert',
+    'get_all', 'page', 'find_by_id', 'find_by_ids', 'find_by_name', 'articles',
+    'articles_page', 'magazines', 'magazines_page', 'articles_for_many',
+    'magazines_for_many', 'topic_areas_for_many', 'add_article', 'topic_areas',
+)
+class Author(Model):
+    # Read-through cache for find_by_id/find_by_name, keyed by ('id', id) or ('name', name).
+    cache = LRUCache()
+
+    table = 'authors'
+    columns = ('name',)
+    row_type = AuthorRow
+    flush_order = 0
 
-class Author:
     def __init__(self, name, id=None):
         self.id = id
+        self._saved = None
         self.name = name
 
-    def save(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        if self.id:
-            cursor.execute("UPDATE authors SET name = ? WHERE id = ?", (self.name, self.id))
-        else:
-            cursor.execute("INSERT INTO authors (name) VALUES (?)", (self.name,))
-            self.id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return self
-
-    def delete(self):
-        if not self.id:
-            return
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM authors WHERE id = ?", (self.id,))
-        conn.commit()
-        conn.close()
+    @classmethod
+    def from_row(cls, row):
+        cached = identity.get(cls, row['id'])
+        if cached is not None:
+            return cached
+        obj = cls(row['name'], row['id'])
+        obj._mark_saved()
+        return identity.add(obj)
+
+    def _drop_cached(self):
+        super()._drop_cached()
+        self.cache.invalidate(('name', self.name))
 
     @classmethod
     def create(cls, name):
@@ -32,70 +56,165 @@ class Author:
         return author.save()
 
     @classmethod
-    def get_all(cls):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM authors")
-        rows = cursor.fetchall()
-        conn.close()
-        return [cls(row['name'], row['id']) for row in rows]
+    def bulk_create(cls, names, batch_size=1000):
+        """Insert many authors (names or unsaved Authors) in one transaction; returns their ids."""
+        rows = ((name.name if isinstance(name, cls) else name,) for name in names)
+        ids = bulk_insert("INSERT INTO authors (name) VALUES (?)", rows, batch_size)
+        cls._invalidate_table()
+        return ids
 
     @classmethod
-    def find_by_id(cls, id):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM authors WHERE id = ?", (id,))
-        row = cursor.fetchone()
-        conn.close()
-        if row:
-            return cls(row['name'], row['id'])
-        return None
+    @retrying
+    def get_or_create(cls, name):
+        """Return (author, created) without a find-then-insert race."""
+        row, created = cls._insert_or_select((name,))
+        author = cls.from_row(row)
+        if created:
+            author._invalidate_cache()
+        return author, created
+
+    @classmethod
+    def upsert(cls, name):
+        """Insert the author or return the existing one with that name.
+
+        Authors have no other columns to update, so this is get_or_create()
+        without the flag.
+        """
+        return cls.get_or_create(name)[0]
+
+    @classmethod
+    def bulk_upsert(cls, names, batch_size=1000):
+        """Insert every name not already present, in one transaction; returns {name: id}."""
+        ids = bulk_upsert(
+            "INSERT INTO authors (name) VALUES (?) ON CONFLICT (name) DO NOTHING",
+            'authors',
+            ((name,) for name in names),
+            batch_size
+        )
+        cls._invalidate_table()
+        return ids
 
     @classmethod
     def find_by_name(cls, name):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM authors WHERE name = ?", (name,))
-        row = cursor.fetchone()
-        conn.close()
+        def load():
+            with connection() as conn:
+                return conn.execute("SELECT * FROM authors WHERE name = ?", (name,)).fetchone()
+        row = cls.cache.get_or_load(('name', name), load)
         if row:
-            return cls(row['name'], row['id'])
+            return cls.from_row(row)
         return None
 
-    def articles(self):
+    def articles(self, include=()):
+        from lib.models.article import Article
+        rows = results.rows(('articles',), "SELECT * FROM articles WHERE author_id = ?", (self.id,))
+        return Article.preload([Article.from_row(row) for row in rows], include)
+
+    def iter_articles(self, chunk_size=1000):
+        """Like articles(), but yields Articles lazily while streaming the rows."""
+        from lib.models.article import Article
+        for row in iter_rows("SELECT * FROM articles WHERE author_id = ?", (self.id,), chunk_size):
+            yield Article.from_row(row)
+
+    def articles_page(self, after_id=None, limit=50, cursor=None):
         from lib.models.article import Article
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM articles WHERE author_id = ?", (self.id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [Article(row['title'], row['author_id'], row['magazine_id'], row['id']) for row in rows]
+        return paginate(
+            "SELECT * FROM articles WHERE author_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (self.id,), Article.from_row, after_id, limit, cursor
+        )
 
     def magazines(self):
         from lib.models.magazine import Magazine
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        if has_table('author_magazine_counts'):
+            rows = results.rows(('articles', 'magazines'), """
+                SELECT magazines.* FROM author_magazine_counts edges
+                JOIN magazines ON magazines.id = edges.magazine_id
+                WHERE edges.author_id = ?
+            """, (self.id,))
+            return [Magazine.from_row(row) for row in rows]
+        rows = results.rows(('articles', 'magazines'), """
             SELECT DISTINCT magazines.* FROM magazines
             JOIN articles ON magazines.id = articles.magazine_id
             WHERE articles.author_id = ?
         """, (self.id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [Magazine(row['name'], row['category'], row['id']) for row in rows]
+        return [Magazine.from_row(row) for row in rows]
+
+    def magazines_page(self, after_id=None, limit=50, cursor=None):
+        from lib.models.magazine import Magazine
+        if has_table('author_magazine_counts'):
+            return paginate("""
+                SELECT magazines.* FROM author_magazine_counts edges
+                JOIN magazines ON magazines.id = edges.magazine_id
+                WHERE edges.author_id = ? AND edges.magazine_id > ?
+                ORDER BY edges.magazine_id LIMIT ?
+            """, (self.id,), Magazine.from_row, after_id, limit, cursor)
+        return paginate("""
+            SELECT * FROM magazines
+            WHERE EXISTS (
+                SELECT 1 FROM articles
+                WHERE articles.magazine_id = magazines.id AND articles.author_id = ?
+            )
+            AND id > ? ORDER BY id LIMIT ?
+        """, (self.id,), Magazine.from_row, after_id, limit, cursor)
+
+    @classmethod
+    def articles_for_many(cls, authors):
+        """Resolve articles() for many authors with one query per 500; returns {author id: [Article]}."""
+        from lib.models.article import Article
+        grouped = fetch_grouped("SELECT * FROM articles WHERE author_id IN ({placeholders})", authors, 'author_id')
+        return {id: [Article.from_row(row) for row in rows] for id, rows in grouped.items()}
+
+    @classmethod
+    def magazines_for_many(cls, authors):
+        """Resolve magazines() for many authors at once; returns {author id: [Magazine]}."""
+        from lib.models.magazine import Magazine
+        if has_table('author_magazine_counts'):
+            sql = """
+                SELECT edges.author_id AS owner_id, magazines.* FROM author_magazine_counts edges
+                JOIN magazines ON magazines.id = edges.magazine_id
+                WHERE edges.author_id IN ({placeholders})
+            """
+        else:
+            sql = """
+                SELECT DISTINCT articles.author_id AS owner_id, magazines.* FROM magazines
+                JOIN articles ON magazines.id = articles.magazine_id
+                WHERE articles.author_id IN ({placeholders})
+            """
+        grouped = fetch_grouped(sql, authors, 'owner_id')
+        return {id: [Magazine.from_row(row) for row in rows] for id, rows in grouped.items()}
+
+    @classmethod
+    def topic_areas_for_many(cls, authors):
+        """Resolve topic_areas() for many authors at once; returns {author id: [category]}."""
+        if has_table('author_magazine_counts'):
+            sql = """
+                SELECT DISTINCT edges.author_id AS owner_id, magazines.category FROM author_magazine_counts edges
+                JOIN magazines ON magazines.id = edges.magazine_id
+                WHERE edges.author_id IN ({placeholders})
+            """
+        else:
+            sql = """
+                SELECT DISTINCT articles.author_id AS owner_id, magazines.category FROM magazines
+                JOIN articles ON magazines.id = articles.magazine_id
+                WHERE articles.author_id IN ({placeholders})
+            """
+        grouped = fetch_grouped(sql, authors, 'owner_id')
+        return {id: [row['category'] for row in rows] for id, rows in grouped.items()}
 
     def add_article(self, magazine, title):
         from lib.models.article import Article
         return Article.create(title, self, magazine)
 
     def topic_areas(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        if has_table('author_magazine_counts'):
+            rows = results.rows(('articles', 'magazines'), """
+                SELECT DISTINCT magazines.category FROM author_magazine_counts edges
+                JOIN magazines ON magazines.id = edges.magazine_id
+                WHERE edges.author_id = ?
+            """, (self.id,))
+            return [row['category'] for row in rows]
+        rows = results.rows(('articles', 'magazines'), """
             SELECT DISTINCT category FROM magazines
             JOIN articles ON magazines.id = articles.magazine_id
             WHERE articles.author_id = ?
         """, (self.id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [row['category'] for row in rows]
\ No newline at end of file
+        return [row['category'] for row in rows]
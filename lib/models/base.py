@@ -0,0 +1,216 @@
+from lib.db import identity, loader
+from lib.db.bulk import batched
+from lib.db.cache import results
+from lib.db.connection import after_commit, after_rollback, connection, iter_rows
+from lib.db.migrate import has_index
+from lib.db.pagination import paginate
+from lib.db.retry import begin_immediate, retrying
+from lib.db.session import current_session
+
+
+class Model:
+    """Writes, change tracking and batched lookups shared by the models.
+
+    Subclasses set table, columns (the writable columns, without id),
+    row_type (the namedtuple of id and columns returned in lean mode), cache
+    and from_row().
+    """
+    table = None
+    columns = ()
+    row_type = None
+
+    def _values(self):
+        return tuple(getattr(self, column) for column in self.columns)
+
+    def _mark_saved(self):
+        self._saved = self._values()
+
+    def changed_columns(self):
+        """Columns whose value differs from what was last loaded or saved (all of them if unknown)."""
+        if self._saved is None:
+            return self.columns
+        return tuple(
+            column for column, old, new in zip(self.columns, self._saved, self._values()) if old != new
+        )
+
+    @classmethod
+    def _insert_sql(cls):
+        return (
+            f"INSERT INTO {cls.table} ({', '.join(cls.columns)}) "
+            f"VALUES ({', '.join('?' * len(cls.columns))})"
+        )
+
+    def _update_statement(self):
+        """UPDATE touching only the changed columns, as (sql, params)."""
+        changed = self.changed_columns()
+        assignments = ", ".join(f"{column} = ?" for column in changed)
+        return (
+            f"UPDATE {self.table} SET {assignments} WHERE id = ?",
+            tuple(getattr(self, column) for column in changed) + (self.id,)
+        )
+
+    @retrying
+    def save(self):
+        session = current_session()
+        if session is not None:
+            session.add(self)
+            return self
+        if self.id and not self.changed_columns():
+            return self
+        with connection() as conn:
+            cursor = conn.cursor()
+            if self.id:
+                cursor.execute(*self._update_statement())
+            else:
+                cursor.execute(self._insert_sql(), self._values())
+        self._undo_on_rollback(inserted=not self.id)
+        # Take the new id only once the INSERT has committed, so a retried save inserts again.
+        self.id = self.id or cursor.lastrowid
+        self._mark_saved()
+        self._invalidate_cache()
+        identity.add(self)
+        return self
+
+    @retrying
+    def delete(self):
+        session = current_session()
+        if session is not None:
+            session.delete(self)
+            return
+        if not self.id:
+            return
+        identity.discard(self)
+        with connection() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (self.id,))
+        after_rollback(lambda: identity.add(self))
+        self._invalidate_cache()
+
+    def _undo_on_rollback(self, inserted=False):
+        """Once written inside a transaction() that later rolls back, go back to
+        the last saved state; an inserted object also loses its id and
+        identity-map entry, so saving it again inserts it again."""
+        saved = self._saved
+        def undo():
+            self._saved = saved
+            if inserted:
+                identity.discard(self)
+                self.id = None
+        after_rollback(undo)
+
+    def _invalidate_cache(self):
+        """Drop this row from the caches once the write is committed."""
+        after_commit(self._drop_cached)
+
+    def _drop_cached(self):
+        results.bump(self.table)
+        self.cache.invalidate_row(self.id)
+
+    @classmethod
+    def _invalidate_table(cls):
+        """Drop every cached row of this model once the write is committed."""
+        def drop():
+            cls.cache.clear()
+            results.bump(cls.table)
+        after_commit(drop)
+
+    @classmethod
+    def _insert_or_select(cls, values):
+        """Return (row, created) for the row named values[0], inserting it with
+        the given column values if it does not exist yet.
+
+        Existing names are looked up first: even an INSERT that does nothing
+        rewrites the AUTOINCREMENT counter. A missing name is inserted with ON
+        CONFLICT DO NOTHING against the unique index from migration 003, or,
+        without that index, after taking the write lock and looking again.
+        """
+        names = ", ".join(cls.columns)
+        placeholders = ", ".join("?" * len(cls.columns))
+        insert = f"INSERT INTO {cls.table} ({names}) VALUES ({placeholders})"
+        select = f"SELECT * FROM {cls.table} WHERE name = ?"
+        key = (values[0],)
+        with connection() as conn:
+            row = conn.execute(select, key).fetchone()
+            if row is not None:
+                return row, False
+            if has_index(f"ux_{cls.table}_name"):
+                rows = conn.execute(f"{insert} ON CONFLICT (name) DO NOTHING RETURNING *", values).fetchall()
+            else:
+                if not conn.in_transaction:
+                    begin_immediate(conn)
+                taken = conn.execute(select, key).fetchone() is not None
+                rows = [] if taken else conn.execute(f"{insert} RETURNING *", values).fetchall()
+            if rows:
+                return rows[0], True
+            return conn.execute(select, key).fetchone(), False
+
+    @classmethod
+    def find_by_id(cls, id):
+        cached = identity.get(cls, id)
+        if cached is not None:
+            return cached
+        def load():
+            with connection() as conn:
+                return conn.execute(f"SELECT * FROM {cls.table} WHERE id = ?", (id,)).fetchone()
+        row = cls.cache.get_or_load(('id', id), load, row_id=id)
+        if row:
+            return cls.from_row(row)
+        return None
+
+    @classmethod
+    def load(cls, id):
+        """Queue a find_by_id that is coalesced with others in a lib.db.loader.batch() block."""
+        return loader.load(cls, id)
+
+    @classmethod
+    def aload(cls, id):
+        """Awaitable find_by_id, coalesced with other aload() calls in the same event-loop iteration."""
+        return loader.aload(cls, id)
+
+    @classmethod
+    def get_all(cls, lean=False):
+        """Return every row as an instance; with lean=True, as row_type tuples instead."""
+        with connection() as conn:
+            rows = conn.execute(cls._select_all(lean)).fetchall()
+        if lean:
+            return [cls.row_type._make(row) for row in rows]
+        return [cls.from_row(row) for row in rows]
+
+    @classmethod
+    def iter_all(cls, chunk_size=1000, lean=False):
+        """Yield what get_all() returns one at a time, streaming chunk_size rows per fetch."""
+        make = cls.row_type._make if lean else cls.from_row
+        for row in iter_rows(cls._select_all(lean), chunk_size=chunk_size):
+            yield make(row)
+
+    @classmethod
+    def _select_all(cls, lean):
+        columns = ", ".join(cls.row_type._fields) if lean else "*"
+        return f"SELECT {columns} FROM {cls.table}"
+
+    @classmethod
+    def page(cls, after_id=None, limit=50, cursor=None):
+        """Return the Page of rows after after_id (or the given cursor token), ordered by id."""
+        return paginate(
+            f"SELECT * FROM {cls.table} WHERE id > ? ORDER BY id LIMIT ?",
+            (), cls.from_row, after_id, limit, cursor
+        )
+
+    @classmethod
+    def find_by_ids(cls, ids):
+        """Return {id: instance} for the given ids, fetching missing ones with batched IN queries."""
+        found = {}
+        missing = []
+        for id in set(ids):
+            cached = identity.get(cls, id)
+            if cached is not None:
+                found[id] = cached
+            else:
+                missing.append(id)
+        if missing:
+            with connection() as conn:
+                for batch in batched(missing, 500):
+                    placeholders = ", ".join("?" * len(batch))
+                    rows = conn.execute(f"SELECT * FROM {cls.table} WHERE id IN ({placeholders})", batch)
+                    for row in rows:
+                        found[row['id']] = cls.from_row(row)
+        return found
@@ -1,37 +1,52 @@
-from lib.db.connection import get_connection
+from collections import namedtuple
+
+from lib.db import identity
+from lib.db.aio import async_methods
+from lib.db.bulk import batched, bulk_insert, bulk_upsert, fetch_grouped
+from lib.db.cache import LRUCache, results
+from lib.db.connection import connection, iter_rows, transaction
+from lib.db.migrate import has_index, has_table
+from lib.db.pagination import paginate
+from lib.db.retry import retrying
+from lib.models.base import Model
+
+# Lean-mode row view, see AuthorRow.
+MagazineRow = namedtuple('MagazineRow', ['id', 'name', 'category'])
+
+@async_methods(
+    'save', 'delete', 'create', 'bulk_create', 'get_or_create', 'upsert',
+    'bulk_upsert', 'get_all', 'page', 'find_by_id', 'find_by_ids', 'find_by_name',
+    'articles', 'articles_page', 'contributors', 'contributors_page', 'article_titles',
+    'articles_for_many', 'contributors_for_many', 'article_titles_for_many',
+    'contributing_authors', 'top_publisher',
+)
+class Magazine(Model):
+    # Read-through cache for find_by_id/find_by_name, keyed by ('id', id) or ('name', name).
+    cache = LRUCache()
+
+    table = 'magazines'
+    columns = ('name', 'category')
+    row_type = MagazineRow
+    flush_order = 0
 
-class Magazine:
     def __init__(self, name, category, id=None):
         self.id = id
+        self._saved = None
         self.name = name
         self.category = category
 
-    def save(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        if self.id:
-            cursor.execute(
-                "UPDATE magazines SET name = ?, category = ? WHERE id = ?",
-                (self.name, self.category, self.id)
-            )
-        else:
-            cursor.execute(
-                "INSERT INTO magazines (name, category) VALUES (?, ?)",
-                (self.name, self.category)
-            )
-            self.id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return self
-
-    def delete(self):
-        if not self.id:
-            return
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM magazines WHERE id = ?", (self.id,))
-        conn.commit()
-        conn.close()
+    @classmethod
+    def from_row(cls, row):
+        cached = identity.get(cls, row['id'])
+        if cached is not None:
+            return cached
+        obj = cls(row['name'], row['category'], row['id'])
+        obj._mark_saved()
+        return identity.add(obj)
+
+    def _drop_cached(self):
+        super()._drop_cached()
+        self.cache.invalidate(('name', self.name))
 
     @classmethod
     def create(cls, name, category):
@@ -39,71 +54,196 @@ class Magazine:
         return magazine.save()
 
     @classmethod
-    def get_all(cls):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM magazines")
-        rows = cursor.fetchall()
-        conn.close()
-        return [cls(row['name'], row['category'], row['id']) for row in rows]
+    def bulk_create(cls, magazines, batch_size=1000):
+        """Insert many (name, category) pairs or unsaved Magazines in one transaction; returns their ids."""
+        rows = (
+            (magazine.name, magazine.category) if isinstance(magazine, cls) else tuple(magazine)
+            for magazine in magazines
+        )
+        ids = bulk_insert("INSERT INTO magazines (name, category) VALUES (?, ?)", rows, batch_size)
+        cls._invalidate_table()
+        return ids
 
     @classmethod
-    def find_by_id(cls, id):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM magazines WHERE id = ?", (id,))
-        row = cursor.fetchone()
-        conn.close()
-        if row:
-            return cls(row['name'], row['category'], row['id'])
-        return None
+    @retrying
+    def get_or_create(cls, name, category):
+        """Return (magazine, created); an existing magazine keeps its category."""
+        row, created = cls._insert_or_select((name, category))
+        magazine = cls.from_row(row)
+        if created:
+            magazine._invalidate_cache()
+        return magazine, created
+
+    @classmethod
+    @retrying
+    def upsert(cls, name, category):
+        """Insert the magazine or update the category of the existing one with that name."""
+        if not has_index('ux_magazines_name'):
+            with transaction():
+                magazine = cls.get_or_create(name, category)[0]
+                magazine.category = category
+                return magazine.save()
+        with connection() as conn:
+            row = conn.execute("""
+                INSERT INTO magazines (name, category) VALUES (?, ?)
+                ON CONFLICT (name) DO UPDATE SET category = excluded.category
+                RETURNING *
+            """, (name, category)).fetchall()[0]
+        magazine = cls.from_row(row)
+        magazine.category = row['category']
+        magazine._mark_saved()
+        magazine._invalidate_cache()
+        return magazine
+
+    @classmethod
+    def bulk_upsert(cls, magazines, batch_size=1000):
+        """Upsert many (name, category) pairs in one transaction; returns {name: id}.
+
+        Rows whose category is unchanged are left untouched.
+        """
+        ids = bulk_upsert("""
+            INSERT INTO magazines (name, category) VALUES (?, ?)
+            ON CONFLICT (name) DO UPDATE SET category = excluded.category
+            WHERE category != excluded.category
+        """, 'magazines', (tuple(magazine) for magazine in magazines), batch_size)
+        cls._invalidate_table()
+        return ids
 
     @classmethod
     def find_by_name(cls, name):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM magazines WHERE name = ?", (name,))
-        row = cursor.fetchone()
-        conn.close()
+        def load():
+            with connection() as conn:
+                return conn.execute("SELECT * FROM magazines WHERE name = ?", (name,)).fetchone()
+        row = cls.cache.get_or_load(('name', name), load)
         if row:
-            return cls(row['name'], row['category'], row['id'])
+            return cls.from_row(row)
         return None
 
-    def articles(self):
+    @classmethod
+    def find_by_category(cls, category, chunk_size=1000):
+        """Yield the magazines in category, ordered by id, streaming the rows."""
+        rows = iter_rows("SELECT * FROM magazines WHERE category = ? ORDER BY id", (category,), chunk_size)
+        for row in rows:
+            yield cls.from_row(row)
+
+    @classmethod
+    def find_by_categories(cls, categories, chunk_size=1000):
+        """Yield the magazines in any of categories, grouped by category and ordered by id.
+
+        Categories are looked up 500 at a time with one IN query per batch.
+        """
+        for batch in batched(sorted(set(categories)), 500):
+            placeholders = ", ".join("?" * len(batch))
+            rows = iter_rows(
+                f"SELECT * FROM magazines WHERE category IN ({placeholders}) ORDER BY category, id",
+                batch, chunk_size
+            )
+            for row in rows:
+                yield cls.from_row(row)
+
+    def articles(self, include=()):
+        from lib.models.article import Article
+        rows = results.rows(('articles',), "SELECT * FROM articles WHERE magazine_id = ?", (self.id,))
+        return Article.preload([Article.from_row(row) for row in rows], include)
+
+    def iter_articles(self, chunk_size=1000):
+        """Stream this magazine's articles, chunk_size rows per fetch."""
+        from lib.models.article import Article
+        for row in iter_rows("SELECT * FROM articles WHERE magazine_id = ?", (self.id,), chunk_size):
+            yield Article.from_row(row)
+
+    def articles_page(self, after_id=None, limit=50, cursor=None):
         from lib.models.article import Article
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM articles WHERE magazine_id = ?", (self.id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [Article(row['title'], row['author_id'], row['magazine_id'], row['id']) for row in rows]
+        return paginate(
+            "SELECT * FROM articles WHERE magazine_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (self.id,), Article.from_row, after_id, limit, cursor
+        )
 
     def contributors(self):
         from lib.models.author import Author
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        if has_table('author_magazine_counts'):
+            rows = results.rows(('articles', 'authors'), """
+                SELECT authors.* FROM author_magazine_counts edges
+                JOIN authors ON authors.id = edges.author_id
+                WHERE edges.magazine_id = ?
+            """, (self.id,))
+            return [Author.from_row(row) for row in rows]
+        rows = results.rows(('articles', 'authors'), """
             SELECT DISTINCT authors.* FROM authors
             JOIN articles ON authors.id = articles.author_id
             WHERE articles.magazine_id = ?
         """, (self.id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [Author(row['name'], row['id']) for row in rows]
+        return [Author.from_row(row) for row in rows]
+
+    def contributors_page(self, after_id=None, limit=50, cursor=None):
+        from lib.models.author import Author
+        if has_table('author_magazine_counts'):
+            return paginate("""
+                SELECT authors.* FROM author_magazine_counts edges
+                JOIN authors ON authors.id = edges.author_id
+                WHERE edges.magazine_id = ? AND edges.author_id > ?
+                ORDER BY edges.author_id LIMIT ?
+            """, (self.id,), Author.from_row, after_id, limit, cursor)
+        return paginate("""
+            SELECT * FROM authors
+            WHERE EXISTS (
+                SELECT 1 FROM articles
+                WHERE articles.author_id = authors.id AND articles.magazine_id = ?
+            )
+            AND id > ? ORDER BY id LIMIT ?
+        """, (self.id,), Author.from_row, after_id, limit, cursor)
 
     def article_titles(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT title FROM articles WHERE magazine_id = ?", (self.id,))
-        rows = cursor.fetchall()
-        conn.close()
+        rows = results.rows(('articles',), "SELECT title FROM articles WHERE magazine_id = ?", (self.id,))
         return [row['title'] for row in rows]
 
+    @classmethod
+    def articles_for_many(cls, magazines):
+        """Resolve articles() for many magazines with one query per 500; returns {magazine id: [Article]}."""
+        from lib.models.article import Article
+        grouped = fetch_grouped(
+            "SELECT * FROM articles WHERE magazine_id IN ({placeholders})", magazines, 'magazine_id'
+        )
+        return {id: [Article.from_row(row) for row in rows] for id, rows in grouped.items()}
+
+    @classmethod
+    def contributors_for_many(cls, magazines):
+        """Resolve contributors() for many magazines at once; returns {magazine id: [Author]}."""
+        from lib.models.author import Author
+        if has_table('author_magazine_counts'):
+            sql = """
+                SELECT edges.magazine_id AS owner_id, authors.* FROM author_magazine_counts edges
+                JOIN authors ON authors.id = edges.author_id
+                WHERE edges.magazine_id IN ({placeholders})
+            """
+        else:
+            sql = """
+                SELECT DISTINCT articles.magazine_id AS owner_id, authors.* FROM authors
+                JOIN articles ON authors.id = articles.author_id
+                WHERE articles.magazine_id IN ({placeholders})
+            """
+        grouped = fetch_grouped(sql, magazines, 'owner_id')
+        return {id: [Author.from_row(row) for row in rows] for id, rows in grouped.items()}
+
+    @classmethod
+    def article_titles_for_many(cls, magazines):
+        """Resolve article_titles() for many magazines at once; returns {magazine id: [title]}."""
+        grouped = fetch_grouped(
+            "SELECT magazine_id, title FROM articles WHERE magazine_id IN ({placeholders})", magazines, 'magazine_id'
+        )
+        return {id: [row['title'] for row in rows] for id, rows in grouped.items()}
+
     def contributing_authors(self):
         from lib.models.author import Author
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        if has_table('author_magazine_counts'):
+            rows = results.rows(('articles', 'authors'), """
+                SELECT authors.*, counts.article_count
+                FROM author_magazine_counts counts
+                JOIN authors ON authors.id = counts.author_id
+                WHERE counts.magazine_id = ? AND counts.article_count > 2
+            """, (self.id,))
+            return [Author.from_row(row) for row in rows]
+        rows = results.rows(('articles', 'authors'), """
             SELECT authors.*, COUNT(articles.id) as article_count
             FROM authors
             JOIN articles ON authors.id = articles.author_id
@@ -111,24 +251,28 @@ class Magazine:
             GROUP BY authors.id
             HAVING article_count > 2
         """, (self.id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [Author(row['name'], row['id']) for row in rows]
+        return [Author.from_row(row) for row in rows]
 
     @classmethod
     def top_publisher(cls):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        if has_table('magazine_article_counts'):
+            rows = results.rows(('articles', 'magazines'), """
+                SELECT magazines.*, counts.article_count
+                FROM magazine_article_counts counts
+                JOIN magazines ON magazines.id = counts.magazine_id
+                ORDER BY counts.article_count DESC, counts.magazine_id
+                LIMIT 1
+            """)
+            return cls.from_row(rows[0]) if rows else None
+        rows = results.rows(('articles', 'magazines'), """
             SELECT magazines.*, COUNT(articles.id) as article_count
             FROM magazines
             LEFT JOIN articles ON magazines.id = articles.magazine_id
             GROUP BY magazines.id
-            ORDER BY article_count DESC
+            ORDER BY article_count DESC, magazines.id
             LIMIT 1
         """)
-        row = cursor.fetchone()
-        conn.close()
+        row = rows[0] if rows else None
         if row:
-            return cls(row['name'], row['category'], row['id'])
-        return None
\ No newline at end of file
+            return cls.from_row(row)
+        return None
@@ -0,0 +1,90 @@
+"""Time the hot model queries on a synthetic database before and after the index migration.
+
+    python scripts/benchmark_indexes.py [articles] [authors] [magazines]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.db.cache import results
+from lib.db.connection import configure, get_connection
+from lib.db.migrate import migrate
+from lib.models.author import Author
+from lib.models.magazine import Magazine
+
+CATEGORIES = ["Technology", "Science", "Business", "Health", "Sports", "Travel", "Food", "Arts"]
+
+
+def build(path, n_articles, n_authors, n_magazines):
+    configure(database=path, profile='throughput')
+    conn = get_connection()
+    with open("lib/db/schema.sql") as f:
+        conn.executescript(f.read())
+    conn.executemany("INSERT INTO authors (name) VALUES (?)",
+                     ((f"Author {i}",) for i in range(n_authors)))
+    conn.executemany("INSERT INTO magazines (name, category) VALUES (?, ?)",
+                     ((f"Magazine {i}", CATEGORIES[i % len(CATEGORIES)]) for i in range(n_magazines)))
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO articles (title, author_id, magazine_id) VALUES (?, ?, ?)",
+        ((f"Article {i}", rng.randint(1, n_authors), rng.randint(1, n_magazines)) for i in range(n_articles))
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(label, fn, keys):
+    start = time.perf_counter()
+    for key in keys:
+        fn(key)
+    elapsed = time.perf_counter() - start
+    return label, elapsed / len(keys) * 1000
+
+
+def run_queries(n_authors, n_magazines, samples=20):
+    rng = random.Random(7)
+    author_ids = [rng.randint(1, n_authors) for _ in range(samples)]
+    magazine_ids = [rng.randint(1, n_magazines) for _ in range(samples)]
+    return [
+        timed("Author.articles()", lambda i: Author(None, i).articles(), author_ids),
+        timed("Author.magazines()", lambda i: Author(None, i).magazines(), author_ids),
+        timed("Author.topic_areas()", lambda i: Author(None, i).topic_areas(), author_ids),
+        timed("Author.find_by_name()", lambda i: Author.find_by_name(f"Author {i}"), author_ids),
+        timed("Magazine.articles()", lambda i: Magazine(None, None, i).articles(), magazine_ids),
+        timed("Magazine.contributors()", lambda i: Magazine(None, None, i).contributors(), magazine_ids),
+        timed("Magazine.contributing_authors()", lambda i: Magazine(None, None, i).contributing_authors(), magazine_ids),
+        timed("Magazine.find_by_name()", lambda i: Magazine.find_by_name(f"Magazine {i}"), magazine_ids),
+        timed("Magazine.top_publisher()", lambda i: Magazine.top_publisher(), magazine_ids[:3]),
+    ]
+
+
+def main(n_articles=1_000_000, n_authors=10_000, n_magazines=1_000):
+    # Both phases look up the same ids; with caching on, the second phase
+    # would time cache hits instead of the indexes.
+    for cache in (Author.cache, Magazine.cache, results):
+        cache.configure(maxsize=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "bench.db")
+        print(f"Building {n_articles} articles, {n_authors} authors, {n_magazines} magazines...")
+        build(path, n_articles, n_authors, n_magazines)
+        before = run_queries(n_authors, n_magazines)
+
+        conn = get_connection()
+        start = time.perf_counter()
+        migrate(conn)
+        conn.close()
+        print(f"Index migration applied in {time.perf_counter() - start:.1f}s\n")
+        after = run_queries(n_authors, n_magazines)
+
+        print(f"{'query':34} {'before ms':>10} {'after ms':>10} {'speedup':>9}")
+        for (label, old), (_, new) in zip(before, after):
+            print(f"{label:34} {old:10.3f} {new:10.3f} {old / new:8.1f}x")
+        configure()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
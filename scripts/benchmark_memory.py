@@ -0,0 +1,53 @@
+"""Compare the memory held by Article.get_all() with and without lean mode.
+
+    python scripts/benchmark_memory.py [articles]
+"""
+import gc
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.db.connection import configure, get_connection
+from lib.models.article import Article
+from lib.models.author import Author
+from lib.models.magazine import Magazine
+
+
+def build(path, n_articles):
+    configure(database=path, profile='throughput')
+    conn = get_connection()
+    with open("lib/db/schema.sql") as f:
+        conn.executescript(f.read())
+    conn.close()
+    author_ids = Author.bulk_create(f"Author {i}" for i in range(100))
+    magazine_ids = Magazine.bulk_create((f"Magazine {i}", "Technology") for i in range(10))
+    Article.bulk_create(
+        ((f"Article {i}", author_ids[i % 100], magazine_ids[i % 10]) for i in range(n_articles)),
+        batch_size=10_000
+    )
+
+
+def measure(lean):
+    gc.collect()
+    tracemalloc.start()
+    rows = Article.get_all(lean=lean)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), held, peak
+
+
+def main(n_articles=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        build(str(Path(tmp) / "memory.db"), n_articles)
+        print(f"{'mode':8} {'rows':>9} {'held MB':>9} {'peak MB':>9} {'bytes/row':>10}")
+        for lean in (False, True):
+            count, held, peak = measure(lean)
+            print(f"{'lean' if lean else 'model':8} {count:9} {held / 2**20:9.1f} {peak / 2**20:9.1f} {held / count:10.0f}")
+        configure()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
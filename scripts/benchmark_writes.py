@@ -0,0 +1,72 @@
+"""Compare concurrent Article.create() with Article.submit_create() group commits.
+
+    python scripts/benchmark_writes.py [threads] [articles_per_thread]
+"""
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lib.db.connection import configure, get_connection
+from lib.db.writer import configure_writer, get_writer
+from lib.models.article import Article
+from lib.models.author import Author
+from lib.models.magazine import Magazine
+
+
+def build(path):
+    configure(database=path, profile='durable', max_size=64, timeout=60)
+    conn = get_connection()
+    with open("lib/db/schema.sql") as f:
+        conn.executescript(f.read())
+    conn.close()
+    return Author.create("Writer"), Magazine.create("Writes Weekly", "Technology")
+
+
+def run(n_threads, per_thread, write):
+    errors = []
+
+    def worker(n):
+        for i in range(per_thread):
+            try:
+                write(f"Article {n}-{i}")
+            except Exception as exc:
+                errors.append(exc)
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, len(errors)
+
+
+def main(n_threads=8, per_thread=250):
+    total = n_threads * per_thread
+    print(f"{'mode':14} {'writes':>7} {'errors':>7} {'seconds':>8} {'writes/s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        author, magazine = build(str(Path(tmp) / "direct.db"))
+        elapsed, errors = run(n_threads, per_thread, lambda title: Article.create(title, author, magazine))
+        print(f"{'direct':14} {total:7} {errors:7} {elapsed:8.2f} {total / elapsed:9.0f}")
+
+        author, magazine = build(str(Path(tmp) / "queued.db"))
+        configure_writer(max_batch=512, max_delay=0.005)
+        pending = []
+        start = time.perf_counter()
+        _, errors = run(
+            n_threads, per_thread,
+            lambda title: pending.append(Article.submit_create(title, author, magazine)),
+        )
+        errors += sum(future.exception() is not None for future in pending)
+        elapsed = time.perf_counter() - start
+        commits = get_writer().commits
+        print(f"{'group commit':14} {total:7} {errors:7} {elapsed:8.2f} {total / elapsed:9.0f}  ({commits} commits)")
+        configure_writer()
+        configure()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -4,6 +4,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from lib.db.connection import get_connection
+from lib.db.migrate import migrate
 
 def setup_database():
     with open("lib/db/schema.sql") as f:
@@ -13,8 +14,11 @@ def setup_database():
     cursor = conn.cursor()
     cursor.executescript(schema)
     conn.commit()
+    applied = migrate(conn)
     conn.close()
+    if applied:
+        print(f"Applied migrations: {', '.join(map(str, applied))}")
     print("Database setup complete!")
 
 if __name__ == "__main__":
-    setup_database()
\ No newline at end of file
+    setup_database()
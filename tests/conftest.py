@@ -0,0 +1,35 @@
+import pytest
+from lib.db.connection import configure, get_connection
+from lib.db.migrate import migrate
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path):
+    """Point every test at a throwaway database with schema.sql applied,
+    so the tests never touch (or depend on the migrations of) articles.db"""
+    path = str(tmp_path / "test.db")
+    configure(database=path)
+    conn = get_connection()
+    with open("lib/db/schema.sql") as f:
+        conn.executescript(f.read())
+    conn.close()
+    yield path
+    configure()
+
+
+@pytest.fixture
+def migrated_db(database):
+    """Fixture for the test database with every migration applied"""
+    conn = get_connection()
+    migrate(conn)
+    conn.close()
+    return database
+
+
+@pytest.fixture(params=['schema', 'migrated'])
+def any_schema(request, database):
+    """Fixture run once on the schema.sql database and once on the migrated one,
+    for models that pick their queries with has_table()"""
+    if request.param == 'migrated':
+        request.getfixturevalue('migrated_db')
+    return request.param
@@ -13,4 +13,192 @@ def test_article_save():
     assert saved_article.id is not None
     assert saved_article.title == "Test Article"
     assert saved_article.author_id == author.id
-    assert saved_article.magazine_id == magazine.id
\ No newline at end of file
+    assert saved_article.magazine_id == magazine.id
+
+def test_article_bulk_create():
+    from lib.models.author import Author
+    from lib.models.magazine import Magazine
+
+    author_ids = Author.bulk_create(["Bulk Author 1", "Bulk Author 2"])
+    magazine_ids = Magazine.bulk_create([("Bulk Magazine", "Bulk")])
+    assert Author.find_by_id(author_ids[1]).name == "Bulk Author 2"
+
+    rows = ((f"Bulk Article {i}", author_ids[i % 2], magazine_ids[0]) for i in range(25))
+    ids = Article.bulk_create(rows, batch_size=10)
+
+    assert len(ids) == 25
+    assert Article.find_by_id(ids[0]).title == "Bulk Article 0"
+    assert Article.find_by_id(ids[-1]).title == "Bulk Article 24"
+    assert Article.find_by_id(ids[-1]).author_id == author_ids[0]
+
+def test_article_identity_map_reuses_instances():
+    from lib.db import identity_map
+    from lib.models.author import Author
+    from lib.models.magazine import Magazine
+
+    author = Author("Mapped Author").save()
+    magazine = Magazine("Mapped Magazine", "Test").save()
+    article = Article.create("Mapped Article", author, magazine)
+
+    with identity_map():
+        first = Article.find_by_id(article.id)
+        assert Article.find_by_id(article.id) is first
+        assert first.author() is first.author()
+        assert first.magazine() is Magazine.find_by_id(magazine.id)
+
+    assert Article.find_by_id(article.id) is not Article.find_by_id(article.id)
+
+def test_article_get_all_rejects_unknown_include():
+    import pytest
+    with pytest.raises(ValueError):
+        Article.get_all(include=["publisher"])
+
+def test_article_get_all_lean():
+    from lib.models.article import ArticleRow
+
+    rows = Article.get_all(lean=True)
+    assert all(isinstance(row, ArticleRow) for row in rows)
+    assert [row.id for row in rows] == [article.id for article in Article.get_all()]
+    assert [row.title for row in Article.iter_all(lean=True)] == [row.title for row in rows]
+
+def test_article_search(migrated_db):
+    from lib.models.author import Author
+    from lib.models.magazine import Magazine
+
+    author = Author.create("Search Author")
+    tech = Magazine.create("Search Tech", "Technology")
+    other = Magazine.create("Search Other", "Other")
+    python_basics = Article.create("Python Basics", author, tech)
+    Article.create("Advanced Python for Python programmers", author, tech)
+    Article.create("Python Snakes", author, other)
+    Article.create("Gardening", author, tech)
+
+    assert len(Article.search("python")) == 3
+    assert [a.title for a in Article.search("python bas")] == ["Python Basics"]
+    assert Article.search("python bas", prefix=False) == []
+    assert {a.magazine_id for a in Article.search("python", magazine=tech)} == {tech.id}
+    assert Article.search("python", limit=1, author=author.id)[0].author_id == author.id
+
+    python_basics.title = "Rust Basics"
+    python_basics.save()
+    assert [a.title for a in Article.search("basics")] == ["Rust Basics"]
+    assert Article.search('"); DROP TABLE articles; --') == []
+
+def test_article_search_without_fts():
+    from lib.db.migrate import has_table
+    from lib.models.author import Author
+    from lib.models.magazine import Magazine
+    assert not has_table('articles_fts')
+
+    author = Author.create("Search Author")
+    tech = Magazine.create("Search Tech", "Technology")
+    other = Magazine.create("Search Other", "Other")
+    python_basics = Article.create("Python Basics", author, tech)
+    Article.create("Advanced Python for Python programmers", author, tech)
+    Article.create("Python Snakes", author, other)
+
+    assert [a.title for a in Article.search("python")] == [
+        "Python Basics", "Advanced Python for Python programmers", "Python Snakes"
+    ]
+    assert [a.id for a in Article.search("python bas")] == [python_basics.id]
+    assert {a.magazine_id for a in Article.search("python", magazine=tech)} == {tech.id}
+    assert len(Article.search("python", limit=2, author=author.id)) == 2
+    assert Article.search('"); DROP TABLE articles; --') == []
+
+def test_article_submit_create_group_commits(tmp_path):
+    import threading
+    from lib.db import configure, configure_writer, get_connection
+    from lib.db.writer import get_writer, submit
+    from lib.models.author import Author
+    from lib.models.magazine import Magazine
+    configure(database=str(tmp_path / "writer.db"))
+    conn = get_connection()
+    with open("lib/db/schema.sql") as f:
+        conn.executescript(f.read())
+    conn.close()
+    configure_writer(max_batch=50, max_delay=0.05)
+    try:
+        author = Author.create("Queued Author")
+        magazine = Magazine.create("Queued Weekly", "Queues")
+        futures = []
+
+        def produce(n):
+            futures.extend(Article.submit_create(f"Queued {n}-{i}", author, magazine) for i in range(25))
+        threads = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        failing = submit(Article("Orphan", author.id, None).save)
+
+        articles = [future.result(timeout=5) for future in futures]
+        assert all(article.id for article in articles)
+        assert isinstance(failing.exception(timeout=5), Exception)
+        assert len(Article.find_by_magazine(magazine)) == 100
+        assert get_writer().writes == 101
+        assert get_writer().commits < 101
+    finally:
+        configure_writer()
+        configure()
+
+def test_article_submit_create_failed_commit_is_rolled_back(tmp_path):
+    import sqlite3
+    from lib.db import configure, configure_retry, configure_writer
+    from lib.models.author import Author
+    from lib.models.magazine import Magazine
+    author = Author.create("Blocked Author")
+    magazine = Magazine.create("Blocked Weekly", "Locks")
+    configure_retry(busy_timeout=0, initial_backoff=0.005, max_wait=0.1)
+    configure(database=str(tmp_path / "test.db"))
+    configure_writer(max_batch=10, max_delay=0)
+    reader = sqlite3.connect(str(tmp_path / "test.db"))
+    try:
+        # An open read transaction keeps the writer from getting the lock it needs to commit.
+        reader.execute("BEGIN")
+        reader.execute("SELECT * FROM articles").fetchall()
+        first = Article.submit_create("first", author, magazine)
+        assert isinstance(first.exception(timeout=5), sqlite3.OperationalError)
+        reader.rollback()
+
+        Article.submit_create("second", author, magazine).result(timeout=5)
+        assert [article.title for article in Article.find_by_magazine(magazine)] == ["second"]
+    finally:
+        reader.close()
+        configure_writer()
+        configure_retry()
+
+
+def test_article_submit_create_retries_locked_group(tmp_path):
+    import sqlite3
+    import threading
+    from lib.db import configure, configure_retry, configure_writer
+    from lib.db.retry import metrics
+    from lib.db.writer import submit
+    from lib.models.author import Author
+    from lib.models.magazine import Magazine
+    author = Author.create("Blocked Author")
+    magazine = Magazine.create("Blocked Weekly", "Locks")
+    configure_retry(busy_timeout=0, initial_backoff=0.005, max_wait=5)
+    configure(database=str(tmp_path / "test.db"))
+    configure_writer(max_batch=10, max_delay=0.05)
+    metrics.reset()
+    reader = sqlite3.connect(str(tmp_path / "test.db"), check_same_thread=False)
+    try:
+        reader.execute("BEGIN")
+        reader.execute("SELECT * FROM articles").fetchall()
+        threading.Timer(0.2, reader.rollback).start()
+        queued = Author("Queued Author")
+        saved = submit(queued.save)
+        first = Article.submit_create("first", author, magazine)
+
+        assert first.result(timeout=5).title == "first"
+        assert saved.result(timeout=5) is queued
+        # The failed attempts inserted queued too; their rollback reset its id,
+        # so the retry inserted it again instead of skipping it as saved.
+        assert Author.find_by_name("Queued Author").id == queued.id
+        assert [article.title for article in Article.find_by_magazine(magazine)] == ["first"]
+        assert metrics.stats()['retries'] >= 1
+    finally:
+        reader.close()
+        configure_writer()
+        configure_retry()
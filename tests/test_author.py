@@ -52,4 +52,184 @@ def test_author_save(db_connection):
     db_author = cursor.fetchone()
     
     assert db_author is not None
-    assert db_author['name'] == "New Author"
\ No newline at end of file
+    assert db_author['name'] == "New Author"
+
+def test_author_iter_all(setup_test_data):
+    authors = Author.iter_all()
+    assert not isinstance(authors, list)
+    assert [author.id for author in authors] == [author.id for author in Author.get_all()]
+    assert setup_test_data in [author.id for author in Author.iter_all(chunk_size=1)]
+
+def test_author_iter_all_allows_saving_while_streaming(tmp_path):
+    from lib.db.connection import configure, scope
+    from lib.db.retry import configure_retry
+    # Fail fast instead of waiting out busy_timeout if the stream blocks the writes.
+    configure_retry(busy_timeout=0, max_wait=0.2)
+    configure(database=str(tmp_path / "test.db"))
+    try:
+        Author.bulk_create(f"Streamed Author {i}" for i in range(30))
+        with scope():
+            for author in Author.iter_all(chunk_size=10):
+                author.name += "!"
+                author.save()
+        assert all(author.name.endswith("!") for author in Author.get_all())
+    finally:
+        configure_retry()
+
+def test_author_cache_invalidated_on_rename(setup_test_data):
+    author = Author.find_by_name("Test Author")
+    assert Author.find_by_name("Renamed Author") is None
+
+    hits = Author.cache.hits
+    assert Author.find_by_id(author.id).name == "Test Author"
+    Author.find_by_id(author.id)
+    assert Author.cache.hits == hits + 1
+
+    author.name = "Renamed Author"
+    author.save()
+    assert Author.find_by_id(author.id).name == "Renamed Author"
+    assert Author.find_by_name("Renamed Author").id == author.id
+
+def test_author_get_or_create(migrated_db):
+    author, created = Author.get_or_create("Upserted Author")
+    again, created_again = Author.get_or_create("Upserted Author")
+
+    assert created and not created_again
+    assert again.id == author.id
+
+def test_author_upsert_returns_existing_row(migrated_db):
+    author = Author.upsert("Upserted Once")
+    again = Author.upsert("Upserted Once")
+
+    assert again.id == author.id
+    assert len(Author.get_all()) == 1
+
+def test_author_upsert_does_not_rewrite_existing_row(migrated_db):
+    import sqlite3
+    author = Author.upsert("Upserted Once")
+    watcher = sqlite3.connect(migrated_db)
+    version = watcher.execute("PRAGMA data_version").fetchone()[0]
+    assert Author.upsert("Upserted Once").id == author.id
+    assert watcher.execute("PRAGMA data_version").fetchone()[0] == version
+    watcher.close()
+
+def test_author_get_or_create_without_unique_index():
+    author, created = Author.get_or_create("Upserted Author")
+    again, created_again = Author.get_or_create("Upserted Author")
+
+    assert created and not created_again
+    assert again.id == author.id
+    assert Author.upsert("Upserted Author").id == author.id
+    assert len(Author.get_all()) == 1
+
+def test_author_bulk_upsert_is_idempotent(migrated_db):
+    first = Author.bulk_upsert(f"Feed Author {i % 50}" for i in range(200))
+    second = Author.bulk_upsert(f"Feed Author {i}" for i in range(60))
+
+    assert len(first) == 50
+    assert all(second[name] == id for name, id in first.items())
+    assert len(Author.get_all()) == 60
+
+def test_author_relationships_on_either_schema(any_schema):
+    from lib.db.migrate import has_table
+    from lib.models.article import Article
+    from lib.models.magazine import Magazine
+    assert has_table('author_magazine_counts') == (any_schema == 'migrated')
+    author = Author.create("Edge Author")
+    other = Author.create("Other Author")
+    idle = Author.create("Idle Author")
+    tech = Magazine.create("Edge Tech", "Technology")
+    science = Magazine.create("Edge Science", "Science")
+    for title, writer, magazine in [("One", author, tech), ("Two", author, tech), ("Three", author, science),
+                                    ("Four", other, tech)]:
+        Article.create(title, writer, magazine)
+
+    assert sorted(magazine.name for magazine in author.magazines()) == ["Edge Science", "Edge Tech"]
+    assert sorted(author.topic_areas()) == ["Science", "Technology"]
+    first = author.magazines_page(limit=1)
+    assert [magazine.id for magazine in first] == [tech.id]
+    assert [magazine.id for magazine in author.magazines_page(cursor=first.cursor)] == [science.id]
+    assert {id: sorted(m.id for m in magazines) for id, magazines in Author.magazines_for_many(
+        [author, other, idle]).items()} == {author.id: [tech.id, science.id], other.id: [tech.id], idle.id: []}
+    assert {id: sorted(areas) for id, areas in Author.topic_areas_for_many([author, other, idle]).items()} == {
+        author.id: ["Science", "Technology"], other.id: ["Technology"], idle.id: []}
+
+    assert sorted(contributor.id for contributor in tech.contributors()) == [author.id, other.id]
+    assert [contributor.id for contributor in tech.contributors_page(limit=5)] == [author.id, other.id]
+    assert [contributor.id for contributor in tech.contributors_page(after_id=author.id)] == [other.id]
+    assert {id: sorted(a.id for a in authors) for id, authors in Magazine.contributors_for_many(
+        [tech, science]).items()} == {tech.id: [author.id, other.id], science.id: [author.id]}
+
+    Article.find_by_magazine(science)[0].delete()
+    assert author.topic_areas() == ["Technology"]
+    assert [magazine.id for magazine in author.magazines_page(limit=5)] == [tech.id]
+    assert science.contributors() == []
+    assert Magazine.contributors_for_many([science]) == {science.id: []}
+
+def test_author_load_coalesces_lookups(setup_test_data, monkeypatch):
+    from lib.db import batch
+    other = Author.create("Loaded Author")
+    calls = []
+    find_by_ids = Author.find_by_ids.__func__
+    monkeypatch.setattr(Author, "find_by_ids", classmethod(lambda cls, ids: calls.append(set(ids)) or find_by_ids(cls, ids)))
+
+    with batch():
+        first = Author.load(setup_test_data)
+        second = Author.load(other.id)
+        again = Author.load(setup_test_data)
+        missing = Author.load(-1)
+    assert calls == [{setup_test_data, other.id, -1}]
+    assert first.result().name == "Test Author"
+    assert second.result().name == "Loaded Author"
+    assert again is first
+    assert missing.result() is None
+
+def test_author_aload_coalesces_within_a_tick(setup_test_data, monkeypatch):
+    import asyncio
+    other = Author.create("Async Loaded Author")
+    calls = []
+    find_by_ids = Author.find_by_ids.__func__
+    monkeypatch.setattr(Author, "find_by_ids", classmethod(lambda cls, ids: calls.append(set(ids)) or find_by_ids(cls, ids)))
+
+    async def main():
+        return await asyncio.gather(Author.aload(setup_test_data), Author.aload(other.id), Author.aload(other.id))
+
+    authors = asyncio.run(main())
+    assert [author.name for author in authors] == ["Test Author", "Async Loaded Author", "Async Loaded Author"]
+    assert calls == [{setup_test_data, other.id}]
+
+def test_author_async_methods(migrated_db):
+    import asyncio
+    from lib.models.article import Article
+    from lib.models.magazine import Magazine
+
+    async def main():
+        author = await Author.acreate("Async Author")
+        magazine = await Magazine.acreate("Async Weekly", "Technology")
+        await Article.acreate("Async Article", author, magazine)
+        author.name = "Renamed Async Author"
+        await author.asave()
+        found, articles, magazines = await asyncio.gather(
+            Author.afind_by_id(author.id), author.aarticles(), author.amagazines(),
+        )
+        return found, articles, magazines
+
+    found, articles, magazines = asyncio.run(main())
+    assert found.name == "Renamed Async Author"
+    assert [article.title for article in articles] == ["Async Article"]
+    assert [magazine.name for magazine in magazines] == ["Async Weekly"]
+
+def test_author_aload_callers_are_independent(setup_test_data):
+    import asyncio
+    import gc
+    from lib.db import loader
+
+    async def main():
+        impatient = asyncio.ensure_future(Author.aload(setup_test_data))
+        patient = Author.aload(setup_test_data)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(main()).name == "Test Author"
+    gc.collect()
+    assert len(loader._async_loaders) == 0
@@ -0,0 +1,141 @@
+import time
+from lib.db.cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.get_or_load('a', lambda: {'id': 1})
+    cache.get_or_load('b', lambda: {'id': 2})
+    cache.get_or_load('a', lambda: None)
+    cache.get_or_load('c', lambda: {'id': 3})
+
+    assert cache.get_or_load('a', lambda: {'id': 9}) == {'id': 1}
+    assert cache.get_or_load('b', lambda: {'id': 9}) == {'id': 9}
+    assert cache.stats()['evictions'] == 2
+
+
+def test_misses_are_cached_until_invalidated():
+    cache = LRUCache()
+    calls = []
+    load = lambda: calls.append(1)
+    cache.get_or_load(('id', 7), load, row_id=7)
+    cache.get_or_load(('id', 7), load, row_id=7)
+    assert len(calls) == 1
+
+    cache.invalidate_row(7)
+    cache.get_or_load(('id', 7), load, row_id=7)
+    assert len(calls) == 2
+    assert cache.stats()['hits'] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache(ttl=0.01)
+    cache.get_or_load('a', lambda: {'id': 1})
+    time.sleep(0.02)
+    assert cache.get_or_load('a', lambda: {'id': 2}) == {'id': 2}
+    assert cache.stats()['expirations'] == 1
+
+
+def test_result_cache_invalidates_on_table_writes(tmp_path):
+    import sqlite3
+    from lib.db.cache import ResultCache
+    from lib.db.connection import configure
+
+    path = str(tmp_path / "results.db")
+    configure(database=path)
+    try:
+        raw = sqlite3.connect(path)
+        raw.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, title TEXT)")
+        raw.commit()
+        cache = ResultCache(watch_external=False, poll_interval=0)
+        count = lambda: cache.rows(('articles',), "SELECT COUNT(*) AS n FROM articles")[0]['n']
+
+        assert count() == 0
+        raw.execute("INSERT INTO articles (title) VALUES ('unseen')")
+        raw.commit()
+        assert count() == 0
+        cache.bump('authors')
+        assert count() == 0
+        cache.bump('articles')
+        assert count() == 1
+
+        cache.watch_external = True
+        assert count() == 1
+        raw.execute("INSERT INTO articles (title) VALUES ('external')")
+        raw.commit()
+        assert count() == 2
+        assert cache.stats()['hits'] == 2
+        raw.close()
+    finally:
+        configure()
+
+
+def test_result_cache_ignores_own_commits_when_watching(migrated_db):
+    from lib.db.cache import ResultCache
+    from lib.models.author import Author
+    cache = ResultCache(poll_interval=0)
+    count = lambda: cache.rows(('articles',), "SELECT COUNT(*) AS n FROM articles")[0]['n']
+
+    assert count() == 0
+    Author.create("Local Writer")
+    assert count() == 0
+    assert cache.stats()['hits'] == 1
+
+
+def test_result_cache_without_table_versions_drops_everything_on_change():
+    from lib.db.cache import ResultCache
+    from lib.models.author import Author
+    cache = ResultCache(poll_interval=0)
+    count = lambda: cache.rows(('articles',), "SELECT COUNT(*) AS n FROM articles")[0]['n']
+
+    assert count() == 0
+    Author.create("Local Writer")
+    assert count() == 0
+    assert cache.stats()['hits'] == 0
+
+
+def test_result_cache_sees_external_write_next_to_a_local_one(migrated_db, monkeypatch):
+    import sqlite3
+    from lib.db.cache import results
+    from lib.models.article import Article
+    from lib.models.author import Author
+    from lib.models.magazine import Magazine
+    monkeypatch.setattr(results, 'poll_interval', 0)
+    author = Author.create("Local Author")
+    m1 = Magazine.create("M1", "X")
+    m2 = Magazine.create("M2", "Y")
+    Article.create("Only", author, m1)
+    assert Magazine.top_publisher().id == m1.id
+
+    external = sqlite3.connect(migrated_db)
+    external.executemany(
+        "INSERT INTO articles (title, author_id, magazine_id) VALUES (?, ?, ?)",
+        [(f"External {i}", author.id, m2.id) for i in range(3)]
+    )
+    external.commit()
+    external.close()
+    Author.create("Another Local Author")
+
+    assert Magazine.top_publisher().id == m2.id
+
+
+def test_caches_see_transaction_writes_only_after_commit():
+    import threading
+    from lib.db import transaction
+    from lib.models.author import Author
+    seen = []
+
+    def other_thread(author):
+        seen.append((Author.find_by_id(author.id), Author.find_by_name("Uncommitted")))
+
+    with transaction():
+        author = Author.create("Uncommitted")
+        assert Author.find_by_id(author.id).name == "Uncommitted"
+        worker = threading.Thread(target=other_thread, args=(author,))
+        worker.start()
+        worker.join()
+
+    # The other thread cached the misses it saw; the commit must drop them.
+    assert seen == [(None, None)]
+    assert Author.find_by_id(author.id).name == "Uncommitted"
+    assert Author.find_by_name("Uncommitted").id == author.id
@@ -0,0 +1,298 @@
+import sqlite3
+import threading
+import time
+import pytest
+from lib.db.connection import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """Fixture for a small pool over a throwaway database"""
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=2, timeout=0.2)
+    yield pool
+    pool.close_all()
+
+
+def test_close_returns_connection_to_pool(pool):
+    conn = pool.acquire()
+    conn.close()
+    assert pool.idle == 1
+    assert pool.acquire() is conn
+
+
+def test_pool_is_bounded(pool):
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    threading.Timer(0.05, first.close).start()
+    pool.timeout = 1
+    assert pool.acquire() is first
+    second.close()
+
+
+def test_idle_connections_are_evicted(pool):
+    pool.idle_timeout = 0
+    pool.acquire().close()
+    fresh = pool.acquire()
+    assert pool.size == 1
+    assert pool.idle == 0
+    fresh.close()
+
+
+def test_release_rolls_back_open_transaction(pool):
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+    assert pool.acquire().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_scope_shares_one_connection(tmp_path):
+    from lib.db.connection import configure, get_connection, get_pool, scope
+    configure(database=str(tmp_path / "scope.db"))
+    try:
+        with scope() as conn:
+            first = get_connection()
+            first.close()
+            assert get_connection() is conn
+            assert first is conn
+            assert get_pool().idle == 0
+
+            seen = []
+            worker = threading.Thread(target=lambda: seen.append(get_connection()))
+            worker.start()
+            worker.join()
+            assert seen[0] is not conn
+            seen[0].close()
+        assert get_pool().idle == 2
+    finally:
+        configure()
+
+
+def test_scope_is_not_shared_with_child_tasks():
+    import asyncio
+    from lib.db.connection import scope, transaction
+    from lib.models.author import Author
+
+    class Abort(Exception):
+        pass
+
+    async def rolled_back():
+        with transaction():
+            await asyncio.sleep(0)
+            Author.create("Rolled Back")
+            raise Abort
+
+    async def independent():
+        Author.create("Independent")
+
+    async def main():
+        with scope() as conn:
+            results = await asyncio.gather(rolled_back(), independent(), return_exceptions=True)
+            assert not conn.in_transaction
+            return results
+
+    failed, _ = asyncio.run(main())
+    assert isinstance(failed, Abort)
+    assert Author.find_by_name("Independent") is not None
+    assert Author.find_by_name("Rolled Back") is None
+
+
+def test_interleaved_streams_use_their_own_connections():
+    from lib.db.connection import get_connection, get_pool, iter_rows
+    from lib.models.author import Author
+    Author.bulk_create(f"Author {i}" for i in range(5))
+
+    authors = iter_rows("SELECT name FROM authors ORDER BY id", chunk_size=2)
+    ids = iter_rows("SELECT id FROM authors ORDER BY id DESC LIMIT 3", chunk_size=1)
+    pairs = [(a['name'], b['id']) for a, b in zip(authors, ids)]
+    authors.close()
+
+    assert pairs == [("Author 0", 5), ("Author 1", 4), ("Author 2", 3)]
+    assert get_pool().idle == get_pool().size == 2
+    conn = get_connection()
+    assert get_pool().idle == 1
+    conn.close()
+
+
+def test_abandoned_stream_closed_from_another_thread():
+    from lib.db.connection import get_connection, get_pool, iter_rows
+    from lib.models.author import Author
+    Author.bulk_create(f"Author {i}" for i in range(5))
+
+    stream = iter_rows("SELECT * FROM authors", chunk_size=1)
+    assert next(stream)['name'] == "Author 0"
+    assert get_pool().idle == 0
+    errors = []
+    def close():
+        try:
+            stream.close()
+        except Exception as exc:
+            errors.append(exc)
+    closer = threading.Thread(target=close)
+    closer.start()
+    closer.join()
+
+    assert errors == []
+    assert get_pool().idle == 1
+    conn = get_connection()
+    assert get_pool().idle == 0
+    conn.close()
+
+
+def test_rollback_inside_a_stream_keeps_streaming():
+    from lib.db.connection import iter_rows, scope, transaction
+    from lib.models.author import Author
+    Author.bulk_create(f"Author {i}" for i in range(4))
+
+    class Abort(Exception):
+        pass
+
+    seen = []
+    with scope():
+        for row in iter_rows("SELECT * FROM authors ORDER BY id", chunk_size=1):
+            seen.append(row['name'])
+            try:
+                with transaction():
+                    Author.create(f"Copy of {row['name']}")
+                    raise Abort
+            except Abort:
+                pass
+            author = Author.find_by_id(row['id'])
+            author.name += "!"
+            author.save()
+
+    assert seen == [f"Author {i}" for i in range(4)]
+    assert [author.name for author in Author.get_all()] == [f"Author {i}!" for i in range(4)]
+
+
+def test_profile_pragmas_are_applied(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "profile.db"), profile="throughput")
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+    conn.close()
+    pool.close_all()
+
+
+def test_profile_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("ARTICLES_DB_PROFILE", "readonly-analytics")
+    pool = ConnectionPool(str(tmp_path / "ro.db"))
+    conn = pool.acquire()
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.close()
+    pool.close_all()
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ConnectionPool(str(tmp_path / "bad.db"), profile="turbo")
+
+
+def test_async_executor_pins_a_connection_per_worker(tmp_path):
+    import asyncio
+    from lib.db.aio import configure_executor, get_executor, run
+    from lib.db.connection import configure, get_connection, get_pool
+    configure(database=str(tmp_path / "aio.db"))
+    configure_executor(max_workers=2, max_pending=4)
+    try:
+        def which():
+            time.sleep(0.02)
+            return threading.get_ident(), get_connection()
+
+        async def main():
+            return await asyncio.gather(*(run(which) for _ in range(8)))
+
+        seen = dict(asyncio.run(main()))
+        assert not get_executor()._semaphores
+        assert len(seen) == 2
+        assert len(set(map(id, seen.values()))) == 2
+        assert get_executor().pool.size == 2
+        assert get_pool().size == 0
+    finally:
+        configure_executor()
+        configure()
+
+
+def test_async_cancellation_interrupts_running_query(tmp_path):
+    import asyncio
+    from lib.db.aio import configure_executor, run
+    from lib.db.connection import configure, get_connection
+    configure(database=str(tmp_path / "aio.db"))
+    configure_executor(max_workers=1)
+    started = threading.Event()
+    try:
+        def slow():
+            started.set()
+            return get_connection().execute(
+                "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT count(*) FROM n"
+            ).fetchone()
+
+        async def main():
+            task = asyncio.ensure_future(run(slow))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return await asyncio.wait_for(run(lambda: get_connection().execute("SELECT 1").fetchone()[0]), 5)
+
+        assert asyncio.run(main()) == 1
+    finally:
+        configure_executor()
+        configure()
+
+
+@pytest.fixture
+def contended_db(tmp_path):
+    """Fixture for a schema-only database whose connections never wait on busy_timeout"""
+    from lib.db.connection import configure, get_connection
+    from lib.db.retry import configure_retry, metrics
+    configure_retry(busy_timeout=0, initial_backoff=0.005, max_wait=2)
+    configure(database=str(tmp_path / "locked.db"))
+    conn = get_connection()
+    with open("lib/db/schema.sql") as f:
+        conn.executescript(f.read())
+    conn.close()
+    metrics.reset()
+    yield str(tmp_path / "locked.db")
+    configure_retry()
+    configure()
+
+
+def test_locked_write_is_retried(contended_db):
+    from lib.db.retry import metrics
+    from lib.models.author import Author
+    blocker = sqlite3.connect(contended_db, isolation_level=None, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.1, blocker.rollback).start()
+
+    author = Author("Patient Author").save()
+
+    assert Author.find_by_id(author.id).name == "Patient Author"
+    stats = metrics.stats()
+    assert stats['contended'] == 1 and stats['retries'] >= 1 and stats['failures'] == 0
+    assert stats['wait_seconds'] >= 0.05
+    assert sum(stats['wait_histogram'].values()) == 1
+    blocker.close()
+
+
+def test_locked_write_gives_up_after_max_wait(contended_db):
+    from lib.db.retry import configure_retry, metrics
+    from lib.models.author import Author
+    configure_retry(busy_timeout=0, initial_backoff=0.005, max_wait=0.1)
+    blocker = sqlite3.connect(contended_db, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        author = Author("Impatient Author")
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            author.save()
+        assert author.id is None
+        assert metrics.stats()['failures'] == 1
+    finally:
+        blocker.rollback()
+        blocker.close()
@@ -0,0 +1,60 @@
+import pytest
+from lib.controllers import add_author_with_articles
+from lib.db import transaction
+from lib.models.author import Author
+from lib.models.magazine import Magazine
+
+
+def test_add_author_with_articles():
+    magazine = Magazine.create("Controller Magazine", "Test")
+    articles = ({'title': f"Controller Article {i}", 'magazine_id': magazine.id} for i in range(2500))
+
+    assert add_author_with_articles("Controller Author", articles, batch_size=1000)
+    author = Author.find_by_name("Controller Author")
+    assert len(author.articles()) == 2500
+
+
+def test_add_author_with_articles_rolls_back():
+    magazine = Magazine.create("Controller Rollback", "Test")
+    articles = [{'title': "Fine", 'magazine_id': magazine.id}, {'title': None, 'magazine_id': magazine.id}]
+
+    assert not add_author_with_articles("Controller Rolled Back", articles)
+    assert Author.find_by_name("Controller Rolled Back") is None
+    assert magazine.articles() == []
+
+
+def test_nested_transaction_uses_savepoint():
+    with transaction():
+        outer = Author.create("Savepoint Outer")
+        with pytest.raises(RuntimeError):
+            with transaction():
+                inner = Author.create("Savepoint Inner")
+                raise RuntimeError("inner failure")
+
+    assert Author.find_by_id(outer.id).name == "Savepoint Outer"
+    assert inner.id is None and inner.changed_columns() == ('name',)
+    assert Author.find_by_name("Savepoint Inner") is None
+
+
+def test_rollback_restores_model_state():
+    from lib.db import identity_map
+    kept = Author.create("Kept")
+    doomed = Author.create("Doomed")
+    with identity_map():
+        with pytest.raises(RuntimeError):
+            with transaction():
+                author = Author.create("Rolled Back")
+                rolled_back_id = author.id
+                assert Author.find_by_id(rolled_back_id) is author
+                kept.name = "Renamed"
+                kept.save()
+                Author.find_by_id(doomed.id).delete()
+                raise RuntimeError("abort")
+
+        assert author.id is None
+        assert Author.find_by_id(rolled_back_id) is None
+        assert kept.changed_columns() == ('name',)
+        assert Author.find_by_id(doomed.id).name == "Doomed"
+
+        assert author.save().id is not None
+        assert Author.find_by_name("Rolled Back").id == author.id
@@ -3,6 +3,7 @@ from lib.models.author import Author
 from lib.models.magazine import Magazine
 from lib.models.article import Article
 from lib.db.connection import get_connection
+from lib.db.migrate import has_table
 
 @pytest.fixture
 def db_connection():
@@ -101,4 +102,130 @@ class TestMagazineModel:
         Magazine.create("Science Digest", "Science")
         top_magazine = Magazine.top_publisher()
         assert top_magazine is not None
-        assert top_magazine.name == "Tech Magazine"
\ No newline at end of file
+        assert top_magazine.name == "Tech Magazine"
+
+    def test_magazine_counters_on_either_schema(self, any_schema):
+        assert has_table('magazine_article_counts') == (any_schema == 'migrated')
+        assert Magazine.top_publisher() is None
+
+        writer, other = Author.create("Writer"), Author.create("Other")
+        quiet = Magazine.create("Quiet", "X")
+        busy = Magazine.create("Busy", "Y")
+        assert Magazine.top_publisher().id == quiet.id
+
+        for title in ("One", "Two", "Three"):
+            Article.create(title, writer, busy)
+        Article.create("Four", other, quiet)
+        assert Magazine.top_publisher().id == busy.id
+        assert [author.id for author in busy.contributing_authors()] == [writer.id]
+        assert quiet.contributing_authors() == []
+
+        Article.find_by_magazine(busy)[0].delete()
+        Article.create("Five", other, quiet)
+        Article.create("Six", other, quiet)
+        assert Magazine.top_publisher().id == quiet.id
+        assert busy.contributing_authors() == []
+        assert [author.id for author in quiet.contributing_authors()] == [other.id]
+
+    def test_magazine_articles_eager_loads_authors(self, test_data, monkeypatch):
+        magazine = test_data['magazine']
+        articles = magazine.articles(include=["author", "magazine"])
+
+        def no_queries(*args):
+            raise AssertionError("related row was not preloaded")
+        monkeypatch.setattr(Author, "find_by_id", no_queries)
+        monkeypatch.setattr(Magazine, "find_by_id", no_queries)
+
+        assert sorted(article.author().name for article in articles) == ["Author 1"] * 3 + ["Author 2"]
+        assert all(article.magazine().id == magazine.id for article in articles)
+
+    def test_magazine_iter_articles_streams(self, test_data):
+        magazine = test_data['magazine']
+        stream = magazine.iter_articles(chunk_size=2)
+        assert next(stream).title == "Python Basics"
+        assert [article.title for article in stream] == ["Advanced Python", "Web Development", "Data Science"]
+        assert [m.id for m in Magazine.iter_all(chunk_size=1)] == [m.id for m in Magazine.get_all()]
+
+    def test_magazine_articles_page(self, test_data):
+        magazine = test_data['magazine']
+        first = magazine.articles_page(limit=3)
+        assert [article.title for article in first] == ["Python Basics", "Advanced Python", "Web Development"]
+        assert first.has_next
+
+        second = magazine.articles_page(cursor=first.cursor, limit=3)
+        assert [article.title for article in second] == ["Data Science"]
+        assert second.cursor is None
+
+    def test_magazine_contributors_page(self, test_data):
+        magazine = test_data['magazine']
+        first = magazine.contributors_page(limit=1)
+        second = magazine.contributors_page(after_id=first.next_after_id, limit=1)
+        assert [author.name for author in first] + [author.name for author in second] == ["Author 1", "Author 2"]
+        assert not second.has_next
+
+    def test_magazine_page_rejects_bad_cursor(self):
+        with pytest.raises(ValueError):
+            Magazine.page(cursor="not-a-cursor")
+
+    def test_magazine_save_writes_only_changed_columns(self, test_data, monkeypatch):
+        import lib.models.base
+        magazine = Magazine.find_by_id(test_data['magazine'].id)
+
+        assert magazine.changed_columns() == ()
+        with monkeypatch.context() as patch:
+            patch.setattr(lib.models.base, "connection", None)
+            magazine.save()
+
+        magazine.category = "Tech"
+        assert magazine.changed_columns() == ('category',)
+        assert magazine._update_statement()[0] == "UPDATE magazines SET category = ? WHERE id = ?"
+        magazine.save()
+        assert magazine.changed_columns() == ()
+        assert Magazine.find_by_id(magazine.id).category == "Tech"
+
+    def test_magazine_upsert_updates_category(self, migrated_db):
+        magazine, created = Magazine.get_or_create("Upsert Weekly", "News")
+        assert created
+        assert Magazine.upsert("Upsert Weekly", "Politics").id == magazine.id
+        assert Magazine.find_by_name("Upsert Weekly").category == "Politics"
+
+        ids = Magazine.bulk_upsert([("Upsert Weekly", "Opinion"), ("Upsert Daily", "News")])
+        assert ids["Upsert Weekly"] == magazine.id
+        assert Magazine.find_by_id(magazine.id).category == "Opinion"
+
+    def test_magazine_upsert_without_unique_index(self):
+        magazine, created = Magazine.get_or_create("Upsert Weekly", "News")
+        again, created_again = Magazine.get_or_create("Upsert Weekly", "Politics")
+        assert created and not created_again
+        assert again.id == magazine.id and again.category == "News"
+
+        assert Magazine.upsert("Upsert Weekly", "Politics").id == magazine.id
+        assert Magazine.upsert("Upsert Daily", "News").id != magazine.id
+        assert [(m.name, m.category) for m in Magazine.get_all()] == [
+            ("Upsert Weekly", "Politics"), ("Upsert Daily", "News")
+        ]
+
+    def test_magazine_find_by_category(self, test_data):
+        science = Magazine.create("Science Digest", "Science")
+        nature = Magazine.create("Nature Notes", "Science")
+
+        assert [m.id for m in Magazine.find_by_category("Science")] == [science.id, nature.id]
+        assert [m.name for m in Magazine.find_by_categories(["Technology", "Science", "Science", "Food"])] == [
+            "Science Digest", "Nature Notes", "Tech Magazine"
+        ]
+        assert list(Magazine.find_by_category("Food")) == []
+
+    def test_magazine_batch_loaders(self, test_data):
+        magazine = test_data['magazine']
+        empty = Magazine.create("Empty Magazine", "Nothing")
+        author1, author2 = test_data['authors']
+
+        contributors = Magazine.contributors_for_many([magazine, empty.id])
+        assert sorted(author.name for author in contributors[magazine.id]) == ["Author 1", "Author 2"]
+        assert contributors[empty.id] == []
+        assert len(Magazine.articles_for_many([magazine])[magazine.id]) == 4
+        assert sorted(Magazine.article_titles_for_many([magazine])[magazine.id]) == sorted(magazine.article_titles())
+
+        assert len(Author.articles_for_many([author1, author2])[author1.id]) == 3
+        assert [m.id for m in Author.magazines_for_many([author2])[author2.id]] == [magazine.id]
+        assert Author.topic_areas_for_many([author1, author2]) == {author1.id: ["Technology"], author2.id: ["Technology"]}
@@ -0,0 +1,90 @@
+import sqlite3
+import pytest
+from lib.db.migrate import MigrationError, current_version, migrate, migrations
+
+
+@pytest.fixture
+def schema_db(tmp_path):
+    """Fixture for a fresh database with only schema.sql applied"""
+    conn = sqlite3.connect(str(tmp_path / "migrate.db"))
+    with open("lib/db/schema.sql") as f:
+        conn.executescript(f.read())
+    yield conn
+    conn.close()
+
+
+def test_migrate_applies_indexes_once(schema_db):
+    latest = migrations()[-1][0]
+    assert migrate(schema_db)[-1] == latest
+    assert current_version(schema_db) == latest
+    assert migrate(schema_db) == []
+
+    indexes = {row[0] for row in schema_db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_articles_author_magazine", "idx_articles_magazine_author", "ux_authors_name"} <= indexes
+
+
+def test_author_articles_uses_index(schema_db):
+    migrate(schema_db)
+    plan = " ".join(row[3] for row in schema_db.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM articles WHERE author_id = ?", (1,)))
+    assert "USING INDEX idx_articles_author" in plan
+
+
+def test_natural_key_migration_refuses_duplicates(schema_db):
+    migrate(schema_db, target=2)
+    schema_db.executescript("""
+        INSERT INTO authors (name) VALUES ('Twin'), ('Twin'), ('Solo');
+        INSERT INTO magazines (name, category) VALUES ('Mag', 'A'), ('Mag', 'B');
+    """)
+    with pytest.raises(MigrationError) as error:
+        migrate(schema_db)
+
+    assert "authors: 'Twin' x2" in str(error.value)
+    assert "magazines: 'Mag' x2" in str(error.value)
+    assert "Solo" not in str(error.value)
+    assert current_version(schema_db) == 2
+
+    schema_db.execute("UPDATE authors SET name = 'Twin 2' WHERE id = 2")
+    schema_db.execute("DELETE FROM magazines WHERE id = 2")
+    schema_db.commit()
+    migrate(schema_db)
+    with pytest.raises(sqlite3.IntegrityError):
+        schema_db.execute("INSERT INTO authors (name) VALUES ('Twin')")
+
+
+def test_article_counters_follow_article_writes(schema_db):
+    schema_db.executescript("""
+        INSERT INTO authors (name) VALUES ('A'), ('B');
+        INSERT INTO magazines (name, category) VALUES ('M1', 'X'), ('M2', 'Y');
+        INSERT INTO articles (title, author_id, magazine_id) VALUES ('before migration', 1, 1);
+    """)
+    migrate(schema_db)
+    schema_db.executescript("""
+        INSERT INTO magazines (name, category) VALUES ('M3', 'Z');
+        INSERT INTO articles (title, author_id, magazine_id) VALUES ('a', 1, 1), ('b', 2, 1), ('c', 2, 2);
+        UPDATE articles SET magazine_id = 2 WHERE title = 'b';
+        DELETE FROM articles WHERE title = 'a';
+    """)
+
+    assert schema_db.execute(
+        "SELECT magazine_id, article_count FROM magazine_article_counts ORDER BY magazine_id"
+    ).fetchall() == [(1, 1), (2, 2), (3, 0)]
+    assert schema_db.execute(
+        "SELECT author_id, magazine_id, article_count FROM author_magazine_counts ORDER BY 1, 2"
+    ).fetchall() == schema_db.execute(
+        "SELECT author_id, magazine_id, COUNT(*) FROM articles GROUP BY 1, 2 ORDER BY 1, 2"
+    ).fetchall()
+
+
+def test_top_publisher_reads_counters(migrated_db):
+    from lib.db.connection import get_connection
+    from lib.models.magazine import Magazine
+    conn = get_connection()
+    conn.executescript("""
+        INSERT INTO authors (name) VALUES ('A');
+        INSERT INTO magazines (name, category) VALUES ('Quiet', 'X'), ('Busy', 'Y');
+        INSERT INTO articles (title, author_id, magazine_id) VALUES ('1', 1, 2), ('2', 1, 2), ('3', 1, 2);
+    """)
+    conn.close()
+    assert Magazine.top_publisher().name == "Busy"
+    assert [author.name for author in Magazine.find_by_name("Busy").contributing_authors()] == ["A"]
@@ -0,0 +1,63 @@
+import sqlite3
+import pytest
+from lib.db import Session
+from lib.models.author import Author
+from lib.models.magazine import Magazine
+from lib.models.article import Article
+
+
+def test_session_flushes_new_dirty_and_deleted():
+    doomed = Author.create("Session Doomed")
+    renamed = Author.create("Session Before")
+
+    with Session() as session:
+        fresh = [Author(f"Session Author {i}").save() for i in range(3)]
+        renamed.name = "Session After"
+        renamed.save()
+        doomed.delete()
+        assert fresh[0].id is None
+        assert len(session.new) == 3
+
+    assert [Author.find_by_id(author.id).name for author in fresh] == [f"Session Author {i}" for i in range(3)]
+    assert Author.find_by_id(renamed.id).name == "Session After"
+    assert Author.find_by_id(doomed.id) is None
+
+
+def test_session_rolls_back_on_failure():
+    author = Author.create("Session Rollback")
+    magazine = Magazine.create("Session Magazine", "Test")
+
+    with pytest.raises(RuntimeError):
+        with Session():
+            article = Article.create("Never Written", author, magazine)
+            author.name = "Never Renamed"
+            author.save()
+            raise RuntimeError("abort")
+
+    assert article.id is None
+    assert Author.find_by_id(author.id).name == "Session Rollback"
+
+    session = Session()
+    session.add(Article("Broken", author.id, magazine.id))
+    session.add(Article(None, author.id, magazine.id))
+    with pytest.raises(sqlite3.IntegrityError):
+        session.commit()
+    assert Article.find_by_magazine(magazine) == []
+
+
+def test_session_commit_undone_by_enclosing_rollback():
+    from lib.db import transaction
+    renamed = Author.create("Session Kept")
+
+    with pytest.raises(RuntimeError):
+        with transaction():
+            with Session():
+                fresh = Author("Session Undone").save()
+                renamed.name = "Session Renamed"
+                renamed.save()
+            assert fresh.id is not None
+            raise RuntimeError("abort")
+
+    assert fresh.id is None
+    assert renamed.changed_columns() == ('name',)
+    assert Author.find_by_name("Session Undone") is None